@@ -0,0 +1,178 @@
+"""Benchmarks for the classical alpha-beta search.
+
+Run from the backend directory:
+    python benchmarks/bench_classical.py [--depth 4] [--movetime 3] [--bench ordering]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to allow imports when running as script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import chess
+
+from benchmarks.positions import POSITIONS
+from classical import (
+    MAX_SEARCH_DEPTH,
+    SearchState,
+    TranspositionTable,
+    attack_mobility,
+    classical_search,
+    iterative_deepening,
+    mobility,
+)
+
+# Search configurations compared by the node-count benchmark
+BASELINE = dict(
+    mvv_lva=False,
+    use_killers=False,
+    use_history=False,
+    see_pruning=False,
+    pvs=False,
+    aspiration=False,
+)
+CONFIGS = {
+    "tt only": BASELINE,
+    "+ MVV-LVA": {**BASELINE, "mvv_lva": True},
+    "+ killers": {**BASELINE, "mvv_lva": True, "use_killers": True},
+    "+ history": {**BASELINE, "mvv_lva": True, "use_killers": True, "use_history": True},
+    "+ SEE pruning": {
+        **BASELINE,
+        "mvv_lva": True,
+        "use_killers": True,
+        "use_history": True,
+        "see_pruning": True,
+    },
+    "+ PVS/aspiration": {},
+}
+
+
+def bench_move_ordering(depth: int):
+    print(f"Node counts at depth {depth}")
+    print(f"{'position':<16}" + "".join(f"{name:>18}" for name in CONFIGS))
+    totals = {name: 0 for name in CONFIGS}
+    times = {name: 0.0 for name in CONFIGS}
+    for label, fen in POSITIONS.items():
+        row = f"{label:<16}"
+        for name, options in CONFIGS.items():
+            board = chess.Board(fen)
+            state = SearchState(tt=TranspositionTable(), **options)
+            start = time.perf_counter()
+            iterative_deepening(board, depth, state)
+            times[name] += time.perf_counter() - start
+            totals[name] += state.nodes
+            row += f"{state.nodes:>18}"
+        print(row)
+    print(f"{'total':<16}" + "".join(f"{totals[name]:>18}" for name in CONFIGS))
+    print(f"{'seconds':<16}" + "".join(f"{times[name]:>18.2f}" for name in CONFIGS))
+
+
+def bench_quiescence(depth: int):
+    """Compare a quiescence search against plain searches one ply deeper."""
+    runs = [(depth, True), (depth, False), (depth + 1, False)]
+    headers = [f"depth {d}" + (" + qsearch" if q else "") for d, q in runs]
+    print(f"{'position':<16}" + "".join(f"{header:>28}" for header in headers))
+    times = [0.0] * len(runs)
+    for label, fen in POSITIONS.items():
+        row = f"{label:<16}"
+        for i, (run_depth, use_quiescence) in enumerate(runs):
+            board = chess.Board(fen)
+            state = SearchState(tt=TranspositionTable(), quiescence=use_quiescence)
+            start = time.perf_counter()
+            score, move = iterative_deepening(board, run_depth, state)
+            times[i] += time.perf_counter() - start
+            row += f"{board.san(move) + f' ({score:+.1f})':>28}"
+        print(row)
+    print(f"{'seconds':<16}" + "".join(f"{t:>28.2f}" for t in times))
+
+
+def bench_pruning(movetime: float):
+    """Depth reached within a fixed time budget with and without selective search."""
+    runs = {
+        "full width": dict(null_move=False, lmr=False),
+        "null move": dict(null_move=True, lmr=False),
+        "null move + LMR": dict(null_move=True, lmr=True),
+    }
+    print(f"Depth reached in {movetime}s")
+    print(f"{'position':<16}" + "".join(f"{name:>24}" for name in runs))
+    for label, fen in POSITIONS.items():
+        row = f"{label:<16}"
+        for options in runs.values():
+            board = chess.Board(fen)
+            state = SearchState(tt=TranspositionTable(), **options)
+            _, move = iterative_deepening(
+                board, MAX_SEARCH_DEPTH, state, time.monotonic() + movetime
+            )
+            row += f"{f'{board.san(move)} (d{state.completed_depth})':>24}"
+        print(row)
+
+
+def bench_mobility(depth: int):
+    """Speed of exact and estimated mobility, and how often the chosen move agrees."""
+    boards = [chess.Board(fen) for fen in POSITIONS.values()]
+    repeats = 200
+    for name, function in (("exact", mobility), ("attacks", attack_mobility)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for board in boards:
+                function(board)
+        elapsed = time.perf_counter() - start
+        calls = repeats * len(boards)
+        print(f"{name:<8} {calls / elapsed:>10.0f} calls/s")
+
+    agree = 0
+    print(f"{'position':<16}{'exact':>12}{'attacks':>12}")
+    for label, fen in POSITIONS.items():
+        moves = []
+        for exact in (True, False):
+            board = chess.Board(fen)
+            state = SearchState(tt=TranspositionTable(), exact_mobility=exact)
+            _, move = iterative_deepening(board, depth, state)
+            moves.append(board.san(move))
+        agree += moves[0] == moves[1]
+        print(f"{label:<16}{moves[0]:>12}{moves[1]:>12}")
+    print(f"Same move in {agree}/{len(POSITIONS)} positions at depth {depth}")
+
+
+def bench_parallel(depth: int):
+    """Wall-clock speedup of the multi-process root search over the position suite."""
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    print(f"Fixed depth {depth}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'seconds':>12}{'speedup':>12}{'nodes':>12}")
+    baseline = None
+    for workers in counts:
+        # Warm the process pool so start-up cost is not measured
+        classical_search(chess.Board(), depth=1, workers=workers)
+        nodes = 0
+        start = time.perf_counter()
+        for fen in POSITIONS.values():
+            nodes += classical_search(chess.Board(fen), depth, workers=workers).nodes
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8}{elapsed:>12.2f}{baseline / elapsed:>12.2f}{nodes:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--movetime", type=float, default=3.0)
+    parser.add_argument(
+        "--bench", choices=["ordering", "quiescence", "pruning", "mobility", "parallel"], default="ordering"
+    )
+    args = parser.parse_args()
+    if args.bench == "ordering":
+        bench_move_ordering(args.depth)
+    elif args.bench == "quiescence":
+        bench_quiescence(args.depth)
+    elif args.bench == "mobility":
+        bench_mobility(args.depth)
+    elif args.bench == "parallel":
+        bench_parallel(args.depth)
+    else:
+        bench_pruning(args.movetime)
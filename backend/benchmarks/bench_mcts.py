@@ -0,0 +1,188 @@
+"""Benchmarks for the MCTS agents.
+
+Run from the backend directory:
+    python benchmarks/bench_mcts.py [--rounds 2000] [--bench nodes|parallel|tree|playouts]
+        [--workers N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path to allow imports when running as script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import chess
+
+from benchmarks.positions import POSITIONS
+from classical import classical_search, shannon_score
+from mcts import (
+    AlphaBetaEvaluator,
+    BoundedPlayout,
+    CompactNode,
+    MCTSAgent,
+    Node,
+    RandomPlayout,
+)
+
+NODE_TYPES = {"Node": Node, "CompactNode": CompactNode}
+
+EVALUATORS = {
+    "full": RandomPlayout,
+    "20 plies": lambda: BoundedPlayout(20),
+    "50 plies": lambda: BoundedPlayout(50),
+    "20 shannon": lambda: BoundedPlayout(20, shannon_score),
+    "alpha-beta 1": lambda: AlphaBetaEvaluator(depth=1),
+    "alpha-beta 2": lambda: AlphaBetaEvaluator(depth=2),
+}
+
+
+def count_nodes(root) -> int:
+    count, stack = 0, [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+class TreeOnlyAgent(MCTSAgent):
+    """Skips the rollouts, so that only the tree is built and measured."""
+
+    def rollout(self, board: chess.Board) -> chess.Color | None:
+        return random.choice([chess.WHITE, chess.BLACK, None])
+
+
+def bench_nodes(rounds: int):
+    """Memory per tree node and tree-building speed for each node type.
+
+    Rollouts are replaced by coin flips: they cost the same for every node
+    type and would dominate the time.
+    """
+    print(f"{rounds} playouts per position, rollouts skipped")
+    print(f"{'node type':<14}{'playouts/s':>12}{'nodes':>10}{'bytes/node':>12}")
+    for name, node_type in NODE_TYPES.items():
+        agent = TreeOnlyAgent(rounds, node_type=node_type)
+        playouts = nodes = memory = 0
+        elapsed = 0.0
+        for fen in POSITIONS.values():
+            board = chess.Board(fen)
+            start = time.perf_counter()
+            agent.search(node_type.root(board), board, rounds)
+            elapsed += time.perf_counter() - start
+
+            tracemalloc.start()
+            root = node_type.root(board)
+            agent.search(root, board, rounds)
+            memory += tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            playouts += root.visits
+            nodes += count_nodes(root)
+            del root
+        print(
+            f"{name:<14}{playouts / elapsed:>12.0f}{nodes:>10}{memory / nodes:>12.0f}"
+        )
+
+
+def worker_counts(limit: int | None = None) -> list[int]:
+    """1, 2, 4, ... workers, up to `limit`, by default the CPU count."""
+    limit = limit or os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+def classical_reference() -> dict[str, str]:
+    return {
+        label: classical_search(chess.Board(fen), depth=3).move
+        for label, fen in POSITIONS.items()
+    }
+
+
+def bench_parallel(rounds: int, max_workers: int | None = None):
+    """Playouts per second of root-parallel MCTS, and how often its move agrees
+    with a depth-3 classical search, as workers increase."""
+    reference = classical_reference()
+    print(f"{rounds} playouts per worker, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'playouts/s':>12}{'speedup':>10}{'agree':>8}")
+    baseline = None
+    for workers in worker_counts(max_workers):
+        agent = MCTSAgent(rounds, workers=workers)
+        # Warm the process pool so start-up cost is not measured
+        agent.select_move(chess.Board(POSITIONS["pawn_endgame"]))
+        playouts = agree = 0
+        start = time.perf_counter()
+        for label, fen in POSITIONS.items():
+            agree += agent.select_move(chess.Board(fen)) == reference[label]
+            playouts += agent.last_info.playouts
+        rate = playouts / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(
+            f"{workers:>8}{rate:>12.0f}{rate / baseline:>10.2f}"
+            f"{f'{agree}/{len(POSITIONS)}':>8}"
+        )
+
+
+def bench_tree(rounds: int, max_workers: int | None = None):
+    """Playouts per second of tree-parallel MCTS, whose workers share one tree
+    of `rounds` playouts, and how often its move agrees with a depth-3
+    classical search. One worker is the serial search."""
+    reference = classical_reference()
+    print(f"{rounds} playouts per position, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'playouts/s':>12}{'speedup':>10}{'nodes':>8}{'agree':>8}")
+    baseline = None
+    for workers in worker_counts(max_workers):
+        agent = MCTSAgent(rounds, tree_workers=workers)
+        playouts = nodes = agree = 0
+        start = time.perf_counter()
+        for label, fen in POSITIONS.items():
+            agree += agent.select_move(chess.Board(fen)) == reference[label]
+            playouts += agent.last_info.playouts
+            nodes += agent.last_info.nodes
+        rate = playouts / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(
+            f"{workers:>8}{rate:>12.0f}{rate / baseline:>10.2f}{nodes:>8}"
+            f"{f'{agree}/{len(POSITIONS)}':>8}"
+        )
+
+
+def bench_playouts(rounds: int):
+    """Playouts per second with each leaf evaluator, and how often the move
+    agrees with a depth-3 classical search."""
+    reference = classical_reference()
+    print(f"{rounds} playouts per position")
+    print(f"{'evaluator':<14}{'playouts/s':>12}{'agree':>8}")
+    for name, evaluator in EVALUATORS.items():
+        agent = MCTSAgent(rounds, evaluator=evaluator())
+        playouts = agree = 0
+        start = time.perf_counter()
+        for label, fen in POSITIONS.items():
+            agree += agent.select_move(chess.Board(fen)) == reference[label]
+            playouts += agent.last_info.playouts
+        rate = playouts / (time.perf_counter() - start)
+        print(f"{name:<14}{rate:>12.0f}{f'{agree}/{len(POSITIONS)}':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument(
+        "--bench", choices=["nodes", "parallel", "tree", "playouts"], default="nodes"
+    )
+    # Largest worker count of the parallel benchmarks, by default the CPU count
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    if args.bench == "nodes":
+        bench_nodes(args.rounds)
+    elif args.bench == "parallel":
+        bench_parallel(args.rounds, args.workers)
+    elif args.bench == "tree":
+        bench_tree(args.rounds, args.workers)
+    elif args.bench == "playouts":
+        bench_playouts(args.rounds)
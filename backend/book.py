@@ -0,0 +1,62 @@
+import logging
+import time
+from pathlib import Path
+
+import chess
+import chess.polyglot
+
+from search_info import SearchInfo
+
+logger = logging.getLogger(__name__)
+
+# Built from training/lichess_filtered.pgn by training/build_book.py
+BOOK_PATH = Path("training/opening_book.bin")
+
+
+class OpeningBook:
+    """Polyglot opening book, memory-mapped and binary searched by Zobrist key.
+
+    A lookup reads a few entries of the mapped file, so it costs microseconds
+    however large the book is and the file is shared between processes.
+    """
+
+    def __init__(self, path: Path = BOOK_PATH, weighted: bool = True):
+        self.reader = chess.polyglot.open_reader(path)
+        # Pick moves at random in proportion to their weight, or always the heaviest
+        self.weighted = weighted
+        self.hits = 0
+        self.probes = 0
+
+    @classmethod
+    def open(cls, path: Path = BOOK_PATH, **kwargs) -> "OpeningBook | None":
+        """The book at `path`, or None if it has not been built."""
+        if not Path(path).exists():
+            logger.info(f"No opening book at {path}")
+            return None
+        return cls(path, **kwargs)
+
+    def move(self, board: chess.Board) -> chess.Move | None:
+        self.probes += 1
+        try:
+            if self.weighted:
+                entry = self.reader.weighted_choice(board)
+            else:
+                entry = self.reader.find(board)
+        except IndexError:
+            return None
+        self.hits += 1
+        return entry.move
+
+    def search(self, board: chess.Board) -> SearchInfo | None:
+        """The book move as a search result, or None when out of book."""
+        start = time.perf_counter()
+        move = self.move(board)
+        if move is None:
+            return None
+        san = board.san(move)
+        return SearchInfo(
+            engine="book", move=san, pv=[san], time=time.perf_counter() - start
+        )
+
+    def close(self):
+        self.reader.close()
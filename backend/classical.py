@@ -1,71 +1,1062 @@
+import logging
+import threading
+import time
 from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
 
 import chess
+import chess.polyglot
 
+from book import OpeningBook
+from process_pool import process_pool
+from search_info import SearchInfo
+from tablebase import Tablebase
 
-def classical_move(board: chess.Board, depth: int = 5, alpha_beta: bool = True) -> str:
+logger = logging.getLogger(__name__)
+
+# Bound types stored in the transposition table
+EXACT = 0
+LOWER_BOUND = 1  # Search failed high: true score >= stored score
+UPPER_BOUND = 2  # Search failed low: true score <= stored score
+
+DEFAULT_TT_ENTRIES = 1 << 18
+
+MAX_SEARCH_DEPTH = 64
+MAX_PLY = 128
+TIME_CHECK_INTERVAL = 64  # Nodes between deadline checks
+
+# Move ordering priorities, highest searched first
+PV_MOVE_PRIORITY = 4_000_000
+TT_MOVE_PRIORITY = 3_000_000
+CAPTURE_PRIORITY = 2_000_000
+KILLER_PRIORITY = 1_000_000
+HISTORY_MAX = 500_000  # History scores are halved once one exceeds this
+
+# Files on either side of each file, for finding isolated pawns
+ADJACENT_FILES = [
+    (chess.BB_FILES[file - 1] if file > 0 else 0)
+    | (chess.BB_FILES[file + 1] if file < 7 else 0)
+    for file in range(8)
+]
+
+DEFAULT_PAWN_TABLE_ENTRIES = 1 << 14
+
+# Shannon material weights, indexed by piece type
+MATERIAL_WEIGHTS = [0, 1, 3, 3, 5, 9, 200]
+
+# Piece values used by the static exchange evaluator, indexed by piece type
+SEE_PIECE_VALUES = [0, 1, 3, 3, 5, 9, 200]
+
+# Captures that cannot lift the score to within this margin of alpha are skipped
+DELTA_MARGIN = 2
+
+# Width of the zero window used to test whether a move beats a bound
+NULL_WINDOW = 0.01
+
+# Null-move pruning: skip a turn and search with reduced depth
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+
+# Aspiration windows: later iterations start from a narrow window around the
+# previous score and widen it on failure
+ASPIRATION_MIN_DEPTH = 3
+ASPIRATION_WINDOW = 0.5
+ASPIRATION_MAX_FAILURES = 3  # Fall back to a full window after this many
+
+# Late move reductions: quiet moves ordered late are first searched shallower
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3  # Moves searched at full depth before reducing
+LMR_DEEP_MOVES = 8  # Moves after this are reduced by an extra ply
+
+
+@dataclass(slots=True)
+class TTEntry:
+    key: int
+    depth: int
+    score: float
+    bound: int
+    best_move: chess.Move | None
+    generation: int = 0
+
+
+class TranspositionTable:
+    """Fixed-size transposition table indexed by the Zobrist hash of a position.
+
+    The table never holds more than `max_entries` entries (each entry is roughly
+    100 bytes, so the default of 2^18 entries stays around 25 MB). When two
+    positions map to the same slot the replacement policy decides which one
+    survives:
+
+    - "depth": keep the entry searched to the greater depth (ties go to the new entry)
+    - "always": the newest entry always wins
+
+    Each search starts a new generation with `new_search`. Under the "depth"
+    policy, entries from earlier generations are replaced regardless of depth,
+    so a table kept for a whole game fills with the current position's subtree
+    instead of deep entries from positions that can no longer occur.
+    """
+
+    REPLACEMENT_POLICIES = ("depth", "always")
+
+    def __init__(self, max_entries: int = DEFAULT_TT_ENTRIES, replacement: str = "depth"):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        if replacement not in self.REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        self.max_entries = max_entries
+        self.replacement = replacement
+        self.entries: list[TTEntry | None] = [None] * max_entries
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self.entries if entry is not None)
+
+    def probe(self, key: int) -> TTEntry | None:
+        self.probes += 1
+        entry = self.entries[key % self.max_entries]
+        if entry is None or entry.key != key:
+            return None
+        self.hits += 1
+        return entry
+
+    def store(
+        self,
+        key: int,
+        depth: int,
+        score: float,
+        bound: int,
+        best_move: chess.Move | None,
+    ):
+        index = key % self.max_entries
+        entry = self.entries[index]
+        if entry is not None:
+            if (
+                self.replacement == "depth"
+                and entry.key != key
+                and entry.depth > depth
+                and entry.generation == self.generation
+            ):
+                return
+            if entry.key != key:
+                self.overwrites += 1
+        self.entries[index] = TTEntry(
+            key, depth, score, bound, best_move, self.generation
+        )
+        self.stores += 1
+
+    def new_search(self):
+        """Age the existing entries and reset the statistics."""
+        self.generation += 1
+        self.probes = self.hits = self.stores = self.overwrites = 0
+
+    def clear(self):
+        self.entries = [None] * self.max_entries
+        self.generation = 0
+        self.probes = self.hits = self.stores = self.overwrites = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }
+
+
+class PawnHashTable:
+    """Fixed-size cache of pawn structure keyed on the two pawn bitboards.
+
+    Pawns move or get captured far less often than other pieces, so sibling
+    nodes in the search nearly always share the same pawn structure.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_PAWN_TABLE_ENTRIES):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.entries: list[tuple | None] = [None] * max_entries
+        self.probes = 0
+        self.hits = 0
+
+    def lookup(
+        self, white_pawns: chess.Bitboard, black_pawns: chess.Bitboard
+    ) -> tuple[tuple[int, int], tuple[int, int]]:
+        """Doubled and isolated pawn counts, computed on a miss."""
+        self.probes += 1
+        index = hash((white_pawns, black_pawns)) % self.max_entries
+        entry = self.entries[index]
+        if entry is not None and entry[0] == white_pawns and entry[1] == black_pawns:
+            self.hits += 1
+            return entry[2], entry[3]
+        doubled, isolated = pawn_structure(white_pawns, black_pawns)
+        self.entries[index] = (white_pawns, black_pawns, doubled, isolated)
+        return doubled, isolated
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+
+class IncrementalEvaluator:
+    """Material counts kept in step with the board during a search.
+
+    `push` must be called with each move before it is pushed on the board and
+    `pop` after it is popped. Material is then available without scanning the
+    board, and pawn structure comes from bitboards and the pawn hash table.
+    """
+
+    def __init__(
+        self,
+        board: chess.Board,
+        pawn_table: PawnHashTable | None = None,
+        exact_mobility: bool = True,
+    ):
+        self.material = 0  # Shannon material balance from White's point of view
+        self.piece_counts = [[0] * 7, [0] * 7]  # [color][piece_type]
+        self.pawn_table = pawn_table
+        self.exact_mobility = exact_mobility
+        self.undo: list[list[tuple[chess.Color, chess.PieceType, int]]] = []
+        for piece in board.piece_map().values():
+            self._update(piece.color, piece.piece_type, 1)
+
+    def _update(self, color: chess.Color, piece_type: chess.PieceType, delta: int):
+        self.piece_counts[color][piece_type] += delta
+        weight = MATERIAL_WEIGHTS[piece_type]
+        self.material += delta * weight if color == chess.WHITE else -delta * weight
+
+    def push(self, board: chess.Board, move: chess.Move):
+        changes = []
+        if move:  # Null moves change nothing
+            them = not board.turn
+            if board.is_en_passant(move):
+                changes.append((them, chess.PAWN, -1))
+            else:
+                captured = board.piece_type_at(move.to_square)
+                if captured is not None:
+                    changes.append((them, captured, -1))
+            if move.promotion:
+                changes.append((board.turn, chess.PAWN, -1))
+                changes.append((board.turn, move.promotion, 1))
+            for change in changes:
+                self._update(*change)
+        self.undo.append(changes)
+
+    def pop(self):
+        for color, piece_type, delta in reversed(self.undo.pop()):
+            self._update(color, piece_type, -delta)
+
+    def evaluate(self, board: chess.Board) -> float:
+        """The Shannon score of the board, from White's point of view."""
+        return score_from_terms(
+            board,
+            self.material,
+            *pawn_stats(board, self.pawn_table),
+            exact_mobility=self.exact_mobility,
+        )
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline has passed."""
+
+
+@dataclass
+class SearchState:
+    """Mutable state shared by every node of one alpha-beta search."""
+
+    tt: TranspositionTable | None = None
+    deadline: float | None = None
+    nodes: int = 0
+    root_ply: int = 0
+    # Principal variation of the last completed iteration, searched first
+    prev_pv: list[chess.Move] = field(default_factory=list)
+    # Triangular PV table: pv_table[ply] is the best line found from that ply
+    pv_table: list[list[chess.Move]] = field(
+        default_factory=lambda: [[] for _ in range(MAX_PLY + 1)]
+    )
+    # Two quiet moves per ply that most recently caused a beta cutoff
+    use_killers: bool = True
+    killers: list[list[chess.Move | None]] = field(
+        default_factory=lambda: [[None, None] for _ in range(MAX_PLY + 1)]
+    )
+    # Cutoff counts for quiet moves, indexed by [color][from_square * 64 + to_square]
+    use_history: bool = True
+    history: list[list[int]] = field(
+        default_factory=lambda: [[0] * 4096, [0] * 4096]
+    )
+    cutoffs: int = 0
+    # Order captures by MVV-LVA, losing ones (by SEE) last; without it every
+    # capture and promotion gets the same priority
+    mvv_lva: bool = True
+    # Skip captures that lose material according to SEE one ply above the horizon
+    see_pruning: bool = True
+    see_pruned: int = 0
+    # Resolve captures at the horizon instead of evaluating noisy positions
+    quiescence: bool = True
+    qnodes: int = 0
+    null_move: bool = False
+    null_move_cutoffs: int = 0
+    lmr: bool = False
+    lmr_researches: int = 0
+    # Principal variation search: moves after the first get a zero window
+    pvs: bool = True
+    pvs_researches: int = 0
+    aspiration: bool = True
+    aspiration_researches: int = 0
+    completed_depth: int = 0
+    # (depth, score, move, pv) for every completed iteration
+    iterations: list[tuple[int, float, chess.Move, list[chess.Move]]] = field(
+        default_factory=list
+    )
+    # Restrict the root to these moves, used to split the root between processes
+    root_moves: list[chess.Move] | None = None
+    # Called with the state after every completed iteration
+    on_iteration: Callable[["SearchState"], None] | None = None
+    # Set from another thread to stop the search, e.g. when pondering
+    stop: threading.Event | None = None
+    # Evaluate leaves from counts updated on push/pop instead of rescanning the board
+    incremental_eval: bool = True
+    # Count legal moves for mobility instead of estimating from attack bitboards
+    exact_mobility: bool = False
+    evaluator: IncrementalEvaluator | None = None
+    pawn_table: PawnHashTable | None = field(default_factory=PawnHashTable)
+    # Exact results for endgames with few pieces
+    tablebase: Tablebase | None = None
+    # Zobrist hashes of positions on the current search path, and of earlier
+    # positions in the game that could still repeat
+    repetitions: dict[int, int] = field(default_factory=dict)
+    game_history: dict[int, int] = field(default_factory=dict)
+
+    def age_history(self):
+        """Halve the history scores, so that older cutoffs count for less."""
+        for side in self.history:
+            for i in range(4096):
+                side[i] //= 2
+
+    def record_cutoff(self, board: chess.Board, move: chess.Move, depth: int, ply: int):
+        """Update the killer and history tables after a quiet move failed high."""
+        self.cutoffs += 1
+        if self.use_killers:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        if self.use_history:
+            table = self.history[board.turn]
+            index = move.from_square * 64 + move.to_square
+            table[index] += depth * depth
+            if table[index] > HISTORY_MAX:
+                self.age_history()
+
+    def push(self, board: chess.Board, move: chess.Move):
+        if self.evaluator is not None:
+            self.evaluator.push(board, move)
+        board.push(move)
+
+    def pop(self, board: chess.Board):
+        board.pop()
+        if self.evaluator is not None:
+            self.evaluator.pop()
+
+    def evaluate(self, board: chess.Board) -> float:
+        """Static evaluation from the point of view of the side to move."""
+        if self.evaluator is not None:
+            score = self.evaluator.evaluate(board)
+        else:
+            score = shannon_score(board, self.pawn_table, self.exact_mobility)
+        return score if board.turn == chess.WHITE else -score
+
+    def is_repetition(self, key: int) -> bool:
+        """Treat a position as drawn once it repeats within the search, or
+        when it would be the third occurrence in the game."""
+        return self.repetitions.get(key, 0) > 0 or self.game_history.get(key, 0) >= 2
+
+    def check_time(self):
+        if self.nodes % TIME_CHECK_INTERVAL != 0:
+            return
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise SearchTimeout()
+        # Like the deadline, a stop request never aborts the first iteration
+        if self.stop is not None and self.stop.is_set() and self.completed_depth:
+            raise SearchTimeout()
+
+
+def classical_move(
+    board: chess.Board,
+    depth: int = 5,
+    alpha_beta: bool = True,
+    tt: TranspositionTable | None = None,
+    movetime: float | None = None,
+    null_move: bool = False,
+    lmr: bool = False,
+    workers: int = 1,
+    info_callback: Callable[[SearchInfo], None] | None = None,
+    stop: threading.Event | None = None,
+    book: OpeningBook | None = None,
+    tablebase: Tablebase | None = None,
+) -> str:
     """Perform the negamax algorithm to select a move.
 
-    Uses the shannon score for evaluation.
+    Uses the shannon score for evaluation. See `classical_search` for the
+    alpha-beta options. Positions in `book` are answered from it.
     """
+    if book is not None and (info := book.search(board)) is not None:
+        if info_callback is not None:
+            info_callback(info)
+        return info.move
+
     if alpha_beta:
-        move = alpha_beta_max(board, depth, -float("inf"), float("inf"))[1]
+        return classical_search(
+            board,
+            depth,
+            tt,
+            movetime,
+            null_move,
+            lmr,
+            workers,
+            info_callback,
+            stop,
+            tablebase=tablebase,
+        ).move
+
+    start = time.perf_counter()
+    score, move = nega_max(board, depth)
+    info = SearchInfo(
+        engine="negamax",
+        move=board.san(move),
+        score=score,
+        depth=depth,
+        time=time.perf_counter() - start,
+        pv=[board.san(move)],
+    )
+    if info_callback is not None:
+        info_callback(info)
+    return info.move
+
+
+def classical_search(
+    board: chess.Board,
+    depth: int = 5,
+    tt: TranspositionTable | None = None,
+    movetime: float | None = None,
+    null_move: bool = False,
+    lmr: bool = False,
+    workers: int = 1,
+    info_callback: Callable[[SearchInfo], None] | None = None,
+    stop: threading.Event | None = None,
+    state: SearchState | None = None,
+    tablebase: Tablebase | None = None,
+) -> SearchInfo:
+    """Run the alpha-beta search and return the move with its score, principal
+    variation and search statistics.
+
+    The search caches results in `tt`; pass a table in to inspect its hit-rate
+    stats afterwards or to keep it warm between moves.
+
+    With `movetime` (in seconds) the search deepens one ply at a time until the
+    time runs out and returns the best move of the deepest completed iteration;
+    `depth` is ignored in that mode.
+
+    `null_move` and `lmr` enable null-move pruning and late move reductions.
+    Both trade a small risk of missing a move for a much deeper search.
+
+    With `workers` > 1 the root moves are split between that many processes,
+    each searching its share with its own transposition table (`tt` is then
+    only used by the single-process search).
+
+    `info_callback` is called after every completed iteration of the
+    single-process search, and with the final result.
+
+    Setting `stop` from another thread ends the single-process search after
+    its first iteration, returning the deepest completed one.
+
+    A fresh `state`, e.g. from `ClassicalEngine`, supplies the tables and
+    options of the single-process search instead of `tt`, `null_move` and
+    `lmr`.
+
+    Positions covered by `tablebase` are answered from it. It also scores
+    positions inside the single-process search; the processes of a parallel
+    search do without it.
+    """
+    start = time.perf_counter()
+    if tablebase is not None and (info := tablebase.search(board)) is not None:
+        if info_callback is not None:
+            info_callback(info)
+        return info
+
+    deadline = time.monotonic() + movetime if movetime is not None else None
+    max_depth = MAX_SEARCH_DEPTH if movetime is not None else depth
+    options = dict(null_move=null_move, lmr=lmr)
+
+    if workers > 1 and board.legal_moves.count() > 1:
+        score, move, completed_depth, pv, counters = parallel_root_search(
+            board, max_depth, deadline, workers, options
+        )
     else:
-        move = nega_max(board, depth)[1]
+        if state is None:
+            if tt is None:
+                tt = TranspositionTable()
+            state = SearchState(tt=tt, tablebase=tablebase, **options)
+        state.stop = stop
+        state.tt.new_search()
+        if info_callback is not None:
+            state.on_iteration = lambda state: info_callback(
+                classical_info(
+                    board, state.iterations[-1], search_counters(state), start
+                )
+            )
+        score, move = iterative_deepening(board, max_depth, state, deadline)
+        logger.debug(
+            f"Searched {state.nodes} nodes ({state.cutoffs} quiet cutoffs), "
+            f"transposition table stats: {state.tt.stats()}"
+        )
+        completed_depth, pv = state.completed_depth, state.prev_pv
+        counters = search_counters(state)
 
-    return board.san(move)
+    info = classical_info(board, (completed_depth, score, move, pv), counters, start)
+    if info_callback is not None:
+        info_callback(info)
+    return info
 
 
-def alpha_beta_max(board: chess.Board, depth: int, alpha: float, beta: float) -> str:
-    if board.is_checkmate():
-        return -float("inf"), ""
+class ClassicalEngine:
+    """Search tables kept across the moves of one game.
+
+    Every search starts from the transposition table, history scores and killer
+    moves of the previous one. All of them have a fixed size, so memory stays
+    bounded however long the game: `tt_entries` caps the transposition table,
+    whose older generations are replaced first, history scores are halved
+    before every search and killer moves are shifted to the new root.
+    """
+
+    def __init__(
+        self,
+        tt_entries: int = DEFAULT_TT_ENTRIES,
+        null_move: bool = False,
+        lmr: bool = False,
+        book: OpeningBook | None = None,
+        tablebase: Tablebase | None = None,
+    ):
+        self.null_move = null_move
+        self.lmr = lmr
+        self.book = book
+        self.tablebase = tablebase
+        self.tt = TranspositionTable(tt_entries)
+        self.new_game()
+
+    def new_game(self):
+        """Forget everything learned in the previous game."""
+        self.tt.clear()
+        self.pawn_table = PawnHashTable()
+        self.history = [[0] * 4096, [0] * 4096]
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.root_ply: int | None = None
+
+    def new_state(self, board: chess.Board) -> SearchState:
+        """A search state for `board` that shares this engine's tables."""
+        state = SearchState(
+            tt=self.tt,
+            history=self.history,
+            killers=self.killers,
+            pawn_table=self.pawn_table,
+            null_move=self.null_move,
+            lmr=self.lmr,
+            tablebase=self.tablebase,
+        )
+        state.age_history()
+        # Killers are stored by distance from the root, which has moved on
+        ply = len(board.move_stack)
+        if self.root_ply is not None and self.root_ply <= ply:
+            del self.killers[: ply - self.root_ply]
+        else:
+            self.killers.clear()
+        self.killers.extend(
+            [None, None] for _ in range(MAX_PLY + 1 - len(self.killers))
+        )
+        self.root_ply = ply
+        return state
+
+    def search(
+        self,
+        board: chess.Board,
+        depth: int = 5,
+        movetime: float | None = None,
+        info_callback: Callable[[SearchInfo], None] | None = None,
+        stop: threading.Event | None = None,
+    ) -> SearchInfo:
+        """Search `board`, or play from the book or tablebase when they cover it."""
+        if self.book is not None and (info := self.book.search(board)) is not None:
+            return info
+        if self.tablebase is not None and (
+            info := self.tablebase.search(board)
+        ) is not None:
+            return info
+        return classical_search(
+            board,
+            depth,
+            movetime=movetime,
+            info_callback=info_callback,
+            stop=stop,
+            state=self.new_state(board),
+        )
+
+
+def search_counters(state: SearchState) -> dict[str, int]:
+    """The SearchInfo statistics collected by one search."""
+    return {
+        "nodes": state.nodes,
+        "tt_probes": state.tt.probes if state.tt is not None else 0,
+        "tt_hits": state.tt.hits if state.tt is not None else 0,
+        "cutoffs": state.cutoffs,
+    }
+
+
+def classical_info(
+    board: chess.Board,
+    iteration: tuple[int, float, chess.Move, list[chess.Move]],
+    counters: dict[str, int],
+    start: float,
+) -> SearchInfo:
+    depth, score, move, pv = iteration
+    if not pv or pv[0] != move:
+        pv = [move]
+    pv_board = board.copy(stack=False)
+    pv_san = []
+    for pv_move in pv:
+        pv_san.append(pv_board.san(pv_move))
+        pv_board.push(pv_move)
+    return SearchInfo(
+        engine="classical",
+        move=pv_san[0],
+        score=score,
+        depth=depth,
+        time=time.perf_counter() - start,
+        pv=pv_san,
+        **counters,
+    )
+
+
+def _search_root_subset(
+    board: chess.Board,
+    root_moves: list[chess.Move],
+    max_depth: int,
+    deadline: float | None,
+    options: dict,
+) -> tuple[list[tuple[int, float, chess.Move, list[chess.Move]]], dict[str, int]]:
+    state = SearchState(tt=TranspositionTable(), root_moves=root_moves, **options)
+    iterative_deepening(board, max_depth, state, deadline)
+    return state.iterations, search_counters(state)
+
+
+def parallel_root_search(
+    board: chess.Board,
+    max_depth: int,
+    deadline: float | None,
+    workers: int,
+    options: dict,
+) -> tuple[float, chess.Move, int, list[chess.Move], dict[str, int]]:
+    """Split the root moves between processes and merge their results.
+
+    Moves are dealt out round-robin after ordering, so each process gets a mix
+    of promising and unpromising moves. Processes may finish different depths
+    before the deadline; their scores are compared at the deepest depth all of
+    them completed. A share whose moves all lead to a forced mate stops early,
+    and its mate score stands for every depth after that.
+
+    Returns the score, move, depth, principal variation and the summed
+    search counters.
+    """
+    moves = order_moves(board, list(board.legal_moves))
+    workers = min(workers, len(moves))
+    shares = [moves[i::workers] for i in range(workers)]
+    pool = process_pool(workers)
+    futures = [
+        pool.submit(_search_root_subset, board, share, max_depth, deadline, options)
+        for share in shares
+    ]
+    results = [future.result() for future in futures]
+    counters = {
+        name: sum(result_counters[name] for _, result_counters in results)
+        for name in results[0][1]
+    }
+
+    finite_depths = [
+        iterations[-1][0]
+        for iterations, _ in results
+        if abs(iterations[-1][1]) != float("inf")
+    ]
+    common_depth = min(finite_depths) if finite_depths else max(
+        iterations[-1][0] for iterations, _ in results
+    )
+
+    best = None
+    for iterations, _ in results:
+        at_depth = [it for it in iterations if it[0] == common_depth]
+        iteration = at_depth[0] if at_depth else iterations[-1]
+        if best is None or iteration[1] > best[1]:
+            best = iteration
+    _, score, move, pv = best
+    return score, move, common_depth, pv, counters
+
+
+def iterative_deepening(
+    board: chess.Board,
+    max_depth: int,
+    state: SearchState,
+    deadline: float | None = None,
+) -> tuple[float, chess.Move | str]:
+    """Run alpha_beta_max at depth 1, 2, ... up to max_depth or until the deadline.
+
+    Each iteration searches the previous principal variation first. The first
+    iteration always runs to completion so that there is a move to return.
+    """
+    root_length = len(board.move_stack)
+    state.root_ply = root_length
+    state.repetitions = {}
+    state.game_history = position_history(board)
+    if state.incremental_eval:
+        state.evaluator = IncrementalEvaluator(
+            board, state.pawn_table, state.exact_mobility
+        )
+    best_score, best_move = -float("inf"), ""
 
+    for depth in range(1, max_depth + 1):
+        state.deadline = deadline if depth > 1 else None
+        try:
+            score, move = aspiration_search(board, depth, best_score, state)
+        except SearchTimeout:
+            # Unwind the moves pushed by the aborted iteration
+            while len(board.move_stack) > root_length:
+                state.pop(board)
+            logger.debug(f"Search stopped during depth {depth}")
+            break
+
+        best_score, best_move = score, move
+        state.completed_depth = depth
+        state.prev_pv = list(state.pv_table[0])
+        state.iterations.append((depth, score, move, state.prev_pv))
+        if state.on_iteration is not None:
+            state.on_iteration(state)
+        logger.debug(
+            f"Depth {depth}: score {score}, nodes {state.nodes}, "
+            f"pv {[m.uci() for m in state.prev_pv]}"
+        )
+
+        # A forced mate will not change with more depth
+        if abs(score) == float("inf"):
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        if state.stop is not None and state.stop.is_set():
+            break
+
+    state.deadline = None
+    return best_score, best_move
+
+
+def aspiration_search(
+    board: chess.Board, depth: int, previous_score: float, state: SearchState
+) -> tuple[float, chess.Move | str]:
+    """Search the root with a window around the previous iteration's score.
+
+    A narrow window prunes more, but a result outside it is only a bound, so
+    the window is widened and the root searched again until the score fits.
+    """
     if (
-        board.is_stalemate()
-        or board.is_insufficient_material()
-        or board.is_seventyfive_moves()
-        or board.is_fivefold_repetition()
+        not state.aspiration
+        or depth < ASPIRATION_MIN_DEPTH
+        or abs(previous_score) == float("inf")
     ):
+        return alpha_beta_max(board, depth, -float("inf"), float("inf"), state)
+
+    window = ASPIRATION_WINDOW
+    alpha, beta = previous_score - window, previous_score + window
+    for _ in range(ASPIRATION_MAX_FAILURES):
+        score, move = alpha_beta_max(board, depth, alpha, beta, state)
+        if alpha < score < beta:
+            return score, move
+        state.aspiration_researches += 1
+        window *= 2
+        if score <= alpha:
+            alpha = score - window
+        else:
+            beta = score + window
+    return alpha_beta_max(board, depth, -float("inf"), float("inf"), state)
+
+
+def alpha_beta_max(
+    board: chess.Board,
+    depth: int,
+    alpha: float,
+    beta: float,
+    state: SearchState | None = None,
+) -> str:
+    if state is None:
+        state = SearchState(root_ply=len(board.move_stack))
+    state.nodes += 1
+    state.check_time()
+
+    ply = len(board.move_stack) - state.root_ply
+    state.pv_table[ply] = []
+
+    if board.is_insufficient_material():
+        return 0, ""
+
+    if ply > 0 and state.tablebase is not None:
+        score = state.tablebase.score(board, ply)
+        if score is not None:
+            return score, ""
+
+    if board.halfmove_clock >= 150:  # Seventy-five-move rule
+        return 0, ""
+
+    key = chess.polyglot.zobrist_hash(board)
+    if ply > 0 and state.is_repetition(key):
         return 0, ""
 
     if depth == 0:
-        return (1 if board.turn == chess.WHITE else -1) * shannon_score(board), ""
+        # Drawn and lost positions at the horizon are not evaluated
+        if not any(board.generate_legal_moves()):
+            return (-float("inf") if board.is_check() else 0), ""
+        if state.quiescence:
+            return quiescence(board, alpha, beta, state), ""
+        return state.evaluate(board), ""
 
-    # Move ordering: prioritize captures and promotions for better alpha-beta pruning
+    # Legal moves are generated once and also decide whether the game is over
     moves = list(board.legal_moves)
-    moves.sort(
-        key=lambda m: (
-            0 if board.is_capture(m) else 1,  # Captures first
-            0 if m.promotion else 1,  # Promotions second
-        )
-    )
+    in_check = board.is_check()
+    if not moves:
+        return (-float("inf") if in_check else 0), ""
+    if ply == 0 and state.root_moves is not None:
+        moves = [move for move in moves if move in state.root_moves]
+
+    tt = state.tt
+    tt_move = None
+    if tt is not None:
+        entry = tt.probe(key)
+        if entry is not None:
+            tt_move = entry.best_move
+            if entry.depth >= depth and tt_move is not None and ply > 0:
+                if (
+                    entry.bound == EXACT
+                    or (entry.bound == LOWER_BOUND and entry.score >= beta)
+                    or (entry.bound == UPPER_BOUND and entry.score <= alpha)
+                ):
+                    state.pv_table[ply] = [tt_move]
+                    return entry.score, tt_move
+
+    # Null move: if passing still fails high, a real move will too. Not used
+    # when only pawns are left, where zugzwang makes passing a real advantage.
+    if (
+        state.null_move
+        and depth >= NULL_MOVE_MIN_DEPTH
+        and ply > 0
+        and not in_check
+        and beta < float("inf")
+        and board.move_stack[-1] != chess.Move.null()
+        and has_non_pawn_material(board, board.turn)
+    ):
+        state.push(board, chess.Move.null())
+        score = -alpha_beta_max(
+            board,
+            depth - 1 - NULL_MOVE_REDUCTION,
+            -beta,
+            -beta + NULL_WINDOW,
+            state,
+        )[0]
+        state.pop(board)
+        if score >= beta:
+            state.null_move_cutoffs += 1
+            return beta, ""
+
+    pv_move = None
+    if (
+        ply < len(state.prev_pv)
+        and board.move_stack[state.root_ply :] == state.prev_pv[:ply]
+    ):
+        pv_move = state.prev_pv[ply]
 
+    moves = order_moves(board, moves, state, ply, tt_move, pv_move)
+
+    # At the frontier a losing capture would be scored before the recapture is
+    # seen, so it is skipped once at least one move has been searched
+    prune_losing_captures = state.see_pruning and depth == 1 and not in_check
+    killers = state.killers[ply]
+
+    repetitions = state.repetitions
+    repetitions[key] = repetitions.get(key, 0) + 1
+
+    original_alpha = alpha
     max_score, best_move = -float("inf"), ""
-    for move in moves:
-        board.push(move)
-        score = -alpha_beta_max(board, depth - 1, -beta, -alpha)[0]
+    for index, move in enumerate(moves):
+        if (
+            prune_losing_captures
+            and max_score > -float("inf")
+            and is_losing_capture(board, move)
+        ):
+            state.see_pruned += 1
+            continue
 
-        board.pop()
+        reduction = 0
+        if (
+            state.lmr
+            and depth >= LMR_MIN_DEPTH
+            and index >= LMR_MIN_MOVES
+            and not in_check
+            and alpha > -float("inf")
+            and move not in killers
+            and not is_tactical(board, move)
+        ):
+            reduction = 1 if index < LMR_DEEP_MOVES else 2
+
+        state.push(board, move)
+        if reduction and board.is_check():
+            reduction = 0
+
+        if max_score == -float("inf") or alpha == -float("inf"):
+            score = -alpha_beta_max(board, depth - 1, -beta, -alpha, state)[0]
+        elif reduction or state.pvs:
+            # Zero-window search, possibly at reduced depth: only prove the move
+            # is no better than alpha, and search it properly if it is
+            score = -alpha_beta_max(
+                board, depth - 1 - reduction, -alpha - NULL_WINDOW, -alpha, state
+            )[0]
+            if reduction and score > alpha:
+                state.lmr_researches += 1
+                score = -alpha_beta_max(
+                    board, depth - 1, -alpha - NULL_WINDOW, -alpha, state
+                )[0]
+            if alpha < score < beta:
+                state.pvs_researches += 1
+                score = -alpha_beta_max(board, depth - 1, -beta, -alpha, state)[0]
+        else:
+            score = -alpha_beta_max(board, depth - 1, -beta, -alpha, state)[0]
+
+        state.pop(board)
 
         if score > max_score:
             max_score = score
             best_move = move
             alpha = max(alpha, score)
+            state.pv_table[ply] = [move] + state.pv_table[ply + 1]
 
         if score >= beta:
-            return max_score, best_move
+            if not is_tactical(board, move):
+                state.record_cutoff(board, move, depth, ply)
+            break
+
+    repetitions[key] -= 1
+
+    if tt is not None:
+        if max_score >= beta:
+            bound = LOWER_BOUND
+        elif max_score <= original_alpha:
+            bound = UPPER_BOUND
+        else:
+            bound = EXACT
+        tt.store(key, depth, max_score, bound, best_move if best_move != "" else None)
 
     return max_score, best_move
 
 
+def position_history(board: chess.Board) -> dict[int, int]:
+    """Count the Zobrist hashes of earlier positions that can still be repeated.
+
+    Only positions since the last capture or pawn move qualify.
+    """
+    history = {}
+    previous = board.copy()
+    for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+        previous.pop()
+        key = chess.polyglot.zobrist_hash(previous)
+        history[key] = history.get(key, 0) + 1
+    return history
+
+
+def quiescence(
+    board: chess.Board, alpha: float, beta: float, state: SearchState
+) -> float:
+    """Search captures and promotions only until the position is quiet.
+
+    The side to move may always "stand pat" on the static evaluation instead of
+    capturing. Captures that lose material according to SEE, or that cannot
+    raise the score to alpha even when winning the captured piece outright
+    (delta pruning), are skipped. When in check every evasion is searched.
+    """
+    state.nodes += 1
+    state.qnodes += 1
+    state.check_time()
+
+    in_check = board.is_check()
+    if in_check:
+        moves = list(board.legal_moves)
+        if not moves:
+            return -float("inf")
+        max_score = -float("inf")
+        stand_pat = None
+    else:
+        stand_pat = state.evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        # Even winning a queen would not reach alpha
+        if stand_pat + SEE_PIECE_VALUES[chess.QUEEN] + DELTA_MARGIN < alpha:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        max_score = stand_pat
+        moves = list(board.generate_legal_captures())
+        moves.extend(
+            board.generate_legal_moves(
+                board.pawns & board.occupied_co[board.turn],
+                chess.BB_BACKRANKS & ~board.occupied,
+            )
+        )
+
+    for move in order_moves(board, moves):
+        if stand_pat is not None:
+            if move.promotion is not None and move.promotion != chess.QUEEN:
+                continue
+            if board.is_en_passant(move):
+                gain = SEE_PIECE_VALUES[chess.PAWN]
+            else:
+                victim = board.piece_type_at(move.to_square)
+                gain = SEE_PIECE_VALUES[victim] if victim else 0
+            if move.promotion:
+                gain += SEE_PIECE_VALUES[chess.QUEEN] - SEE_PIECE_VALUES[chess.PAWN]
+            if stand_pat + gain + DELTA_MARGIN < alpha:
+                continue
+            if is_losing_capture(board, move):
+                continue
+
+        state.push(board, move)
+        score = -quiescence(board, -beta, -alpha, state)
+        state.pop(board)
+
+        if score > max_score:
+            max_score = score
+            alpha = max(alpha, score)
+        if score >= beta:
+            break
+
+    return max_score
+
+
 def nega_max(board, depth) -> str:
-    if board.is_checkmate():
-        return -float("inf"), ""
+    moves = list(board.legal_moves)
+    if not moves:
+        return (-float("inf") if board.is_check() else 0), ""
 
     if (
-        board.is_stalemate()
-        or board.is_insufficient_material()
-        or board.is_seventyfive_moves()
+        board.is_insufficient_material()
+        or board.halfmove_clock >= 150
         or board.is_fivefold_repetition()
     ):
         return 0, ""
@@ -73,14 +1064,7 @@ def nega_max(board, depth) -> str:
     if depth == 0:
         return (1 if board.turn == chess.WHITE else -1) * shannon_score(board), ""
 
-    # Move ordering: prioritize captures and promotions
-    moves = list(board.legal_moves)
-    moves.sort(
-        key=lambda m: (
-            0 if board.is_capture(m) else 1,  # Captures first
-            0 if m.promotion else 1,  # Promotions second
-        )
-    )
+    moves = order_moves(board, moves)
 
     max_score, best_move = -float("inf"), ""
     for move in moves:
@@ -96,7 +1080,146 @@ def nega_max(board, depth) -> str:
     return max_score, best_move
 
 
-def shannon_score(board: chess.Board) -> int:
+def has_non_pawn_material(board: chess.Board, color: chess.Color) -> bool:
+    return bool(board.occupied_co[color] & ~(board.pawns | board.kings))
+
+
+def is_tactical(board: chess.Board, move: chess.Move) -> bool:
+    """Captures and promotions; everything else is a quiet move."""
+    return bool(
+        move.promotion
+        or board.occupied_co[not board.turn] & chess.BB_SQUARES[move.to_square]
+        or board.is_en_passant(move)
+    )
+
+
+def static_exchange_evaluation(board: chess.Board, move: chess.Move) -> int:
+    """Material won or lost by the capture sequence `move` starts on its target square.
+
+    Both sides keep recapturing with their least valuable attacker and may stop
+    whenever continuing would lose material. Attackers are found with bitboards;
+    removing each capturer from the occupancy mask uncovers sliding pieces
+    behind it. Pins are ignored.
+    """
+    to_square = move.to_square
+    occupied = board.occupied & ~chess.BB_SQUARES[move.from_square]
+    if board.is_en_passant(move):
+        captured = chess.PAWN
+        occupied &= ~chess.BB_SQUARES[to_square + (-8 if board.turn else 8)]
+    else:
+        captured = board.piece_type_at(to_square)
+
+    on_square = board.piece_type_at(move.from_square)
+    gains = [SEE_PIECE_VALUES[captured] if captured else 0]
+    if move.promotion:
+        gains[0] += SEE_PIECE_VALUES[move.promotion] - SEE_PIECE_VALUES[chess.PAWN]
+        on_square = move.promotion
+
+    side = not board.turn
+    while True:
+        attackers = board.attackers_mask(side, to_square, occupied) & occupied
+        if not attackers:
+            break
+        for piece_type in chess.PIECE_TYPES:
+            candidates = attackers & board.pieces_mask(piece_type, side)
+            if candidates:
+                break
+        if (
+            piece_type == chess.KING
+            and board.attackers_mask(not side, to_square, occupied) & occupied
+        ):
+            # The king cannot recapture into a square that is still defended
+            break
+        gains.append(SEE_PIECE_VALUES[on_square] - gains[-1])
+        occupied &= ~(candidates & -candidates)
+        on_square = piece_type
+        side = not side
+
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+
+def is_losing_capture(board: chess.Board, move: chess.Move) -> bool:
+    """A capture whose exchange sequence loses material."""
+    victim = board.piece_type_at(move.to_square)
+    if victim is None:
+        return False
+    attacker = board.piece_type_at(move.from_square)
+    # Taking a piece worth at least as much as the capturer can never lose
+    if SEE_PIECE_VALUES[attacker] <= SEE_PIECE_VALUES[victim]:
+        return False
+    return static_exchange_evaluation(board, move) < 0
+
+
+def order_moves(
+    board: chess.Board,
+    moves: list[chess.Move],
+    state: SearchState | None = None,
+    ply: int = 0,
+    tt_move: chess.Move | None = None,
+    pv_move: chess.Move | None = None,
+) -> list[chess.Move]:
+    """Sort moves so the ones most likely to cause a cutoff are searched first.
+
+    Order: previous principal variation, transposition table move, promotions
+    and captures by MVV-LVA (most valuable victim, least valuable attacker),
+    killer moves, quiet moves by history score and finally captures that lose
+    material according to SEE.
+    """
+    them = board.occupied_co[not board.turn]
+    ep_square = board.ep_square
+    pawns = board.pawns
+    if state is not None:
+        killers = state.killers[ply] if state.use_killers else (None, None)
+        history = state.history[board.turn] if state.use_history else None
+        by_mvv_lva = state.mvv_lva
+    else:
+        killers, history = (None, None), None
+        by_mvv_lva = True
+
+    def priority(m: chess.Move) -> int:
+        if m == pv_move:
+            return PV_MOVE_PRIORITY
+        if m == tt_move:
+            return TT_MOVE_PRIORITY
+        if not by_mvv_lva:
+            if (
+                m.promotion
+                or them & chess.BB_SQUARES[m.to_square]
+                or (m.to_square == ep_square and pawns & chess.BB_SQUARES[m.from_square])
+            ):
+                return CAPTURE_PRIORITY
+        elif them & chess.BB_SQUARES[m.to_square]:
+            victim = board.piece_type_at(m.to_square)
+            attacker = board.piece_type_at(m.from_square)
+            mvv_lva = victim * 8 - attacker + (m.promotion or 0) * 8
+            if SEE_PIECE_VALUES[attacker] > SEE_PIECE_VALUES[victim] and (
+                static_exchange_evaluation(board, m) < 0
+            ):
+                return mvv_lva - CAPTURE_PRIORITY
+            return CAPTURE_PRIORITY + mvv_lva
+        if m.promotion:
+            return CAPTURE_PRIORITY + m.promotion * 8
+        if m.to_square == ep_square and pawns & chess.BB_SQUARES[m.from_square]:
+            return CAPTURE_PRIORITY + chess.PAWN * 8 - chess.PAWN
+        if m == killers[0]:
+            return KILLER_PRIORITY + 1
+        if m == killers[1]:
+            return KILLER_PRIORITY
+        if history is not None:
+            return history[m.from_square * 64 + m.to_square]
+        return 0
+
+    moves.sort(key=priority, reverse=True)
+    return moves
+
+
+def shannon_score(
+    board: chess.Board,
+    pawn_table: PawnHashTable | None = None,
+    exact_mobility: bool = True,
+) -> int:
     """Calculate the Shannon score for the current position
     f(p) = 200(K-K')
            + 9(Q-Q')
@@ -108,7 +1231,8 @@ def shannon_score(board: chess.Board) -> int:
 
     KQRBNP = number of kings, queens, rooks, bishops, knights and pawns
     D,S,I = doubled, blocked and isolated pawns
-    M = piece mobility
+    M = piece mobility, counted from legal moves or, without `exact_mobility`,
+        estimated from attack bitboards
     """
     score = 0
     piece_count = count_pieces(board)
@@ -121,14 +1245,45 @@ def shannon_score(board: chess.Board) -> int:
         + 1 * (piece_count["P"] - piece_count["p"])
     )
 
-    doubled, stopped, isolated = pawn_stats(board)
-    score -= 0.5 * (
+    return score_from_terms(
+        board, score, *pawn_stats(board, pawn_table), exact_mobility=exact_mobility
+    )
+
+
+def material_score(board: chess.Board) -> int:
+    """The material balance from White's point of view: the first terms of the
+    Shannon score, counted from the piece bitboards."""
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    score = 0
+    for piece_type, pieces in (
+        (chess.PAWN, board.pawns),
+        (chess.KNIGHT, board.knights),
+        (chess.BISHOP, board.bishops),
+        (chess.ROOK, board.rooks),
+        (chess.QUEEN, board.queens),
+    ):
+        score += MATERIAL_WEIGHTS[piece_type] * (
+            chess.popcount(pieces & white) - chess.popcount(pieces & black)
+        )
+    return score
+
+
+def score_from_terms(
+    board: chess.Board,
+    material: int,
+    doubled: tuple[int, int],
+    stopped: tuple[int, int],
+    isolated: tuple[int, int],
+    exact_mobility: bool = True,
+) -> float:
+    """Combine material and pawn structure into the Shannon score, adding mobility if close."""
+    score = material - 0.5 * (
         doubled[0] - doubled[1] + stopped[0] - stopped[1] + isolated[0] - isolated[1]
     )
 
     # Mobility count is expensive, so only do in close positions
     if -0.1 < score < 0.1:
-        mobility_score = mobility(board)
+        mobility_score = mobility(board) if exact_mobility else attack_mobility(board)
         score += 0.1 * (mobility_score[0] - mobility_score[1])
 
     return score
@@ -143,63 +1298,51 @@ def count_pieces(board: chess.Board) -> dict[str, int]:
 
 
 def pawn_stats(
-    board: chess.Board,
+    board: chess.Board, pawn_table: PawnHashTable | None = None
 ) -> tuple[tuple[int, int], tuple[int, int], tuple[int, int]]:
-    """Optimized pawn statistics calculation using piece_map instead of iterating all squares."""
-    doubled_white, doubled_black = 0, 0
-    stopped_white, stopped_black = 0, 0
-    pawns = [(False, False) for _ in range(8)]
-    pawn_counts = [0, 0, 0, 0, 0, 0, 0, 0]  # White pawns per file
-    black_pawn_counts = [0, 0, 0, 0, 0, 0, 0, 0]  # Black pawns per file
-
-    # Iterate only through existing pieces instead of all 64 squares
-    for square, piece in board.piece_map().items():
-        if piece.piece_type == chess.PAWN:
-            file = chess.square_file(square)
-
-            if piece.color == chess.WHITE:
-                pawn_counts[file] += 1
-                pawns[file] = (True, pawns[file][1])
-                # Check if pawn is stopped (piece directly in front)
-                square_above = square + 8
-                if square_above < 64 and board.piece_at(square_above):
-                    stopped_white += 1
-            else:  # BLACK
-                black_pawn_counts[file] += 1
-                pawns[file] = (pawns[file][0], True)
-                # Check if pawn is stopped (piece directly behind)
-                square_below = square - 8
-                if square_below >= 0 and board.piece_at(square_below):
-                    stopped_black += 1
-
-    # Count doubled pawns
-    for file in range(8):
-        if pawn_counts[file] >= 2:
-            doubled_white += pawn_counts[file]
-        if black_pawn_counts[file] >= 2:
-            doubled_black += black_pawn_counts[file]
+    """Doubled, stopped and isolated pawn counts for (White, Black), from bitboards.
 
-    # Count isolated pawns
-    isolated_white, isolated_black = 0, 0
-    for i in range(8):
-        if i == 0:
-            isolated_white += int(pawns[i][0] and not pawns[i + 1][0])
-            isolated_black += int(pawns[i][1] and not pawns[i + 1][1])
-        elif i == 7:
-            isolated_white += int(pawns[i][0] and not pawns[i - 1][0])
-            isolated_black += int(pawns[i][1] and not pawns[i - 1][1])
-        else:
-            isolated_white += int(
-                pawns[i][0] and (not pawns[i - 1][0]) and (not pawns[i + 1][0])
-            )
-            isolated_black += int(
-                pawns[i][1] and (not pawns[i - 1][1]) and (not pawns[i + 1][1])
-            )
-    return (
-        (doubled_white, doubled_black),
-        (stopped_white, stopped_black),
-        (isolated_white, isolated_black),
+    Doubled and isolated pawns depend only on the pawns, so they are looked up in
+    `pawn_table` when one is given. Stopped pawns depend on every piece and are
+    always computed with one shift per side.
+    """
+    white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+    black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+
+    if pawn_table is not None:
+        doubled, isolated = pawn_table.lookup(white_pawns, black_pawns)
+    else:
+        doubled, isolated = pawn_structure(white_pawns, black_pawns)
+
+    # A pawn is stopped when any piece stands directly in front of it
+    stopped = (
+        chess.popcount((white_pawns << 8) & board.occupied),
+        chess.popcount((black_pawns >> 8) & board.occupied),
     )
+    return doubled, stopped, isolated
+
+
+def pawn_structure(
+    white_pawns: chess.Bitboard, black_pawns: chess.Bitboard
+) -> tuple[tuple[int, int], tuple[int, int]]:
+    """Doubled pawns (every pawn on a file with two or more) and isolated files per side."""
+    doubled_white, doubled_black = 0, 0
+    isolated_white, isolated_black = 0, 0
+    for file in range(8):
+        file_mask = chess.BB_FILES[file]
+        if white_pawns & file_mask:
+            count = chess.popcount(white_pawns & file_mask)
+            if count >= 2:
+                doubled_white += count
+            if not white_pawns & ADJACENT_FILES[file]:
+                isolated_white += 1
+        if black_pawns & file_mask:
+            count = chess.popcount(black_pawns & file_mask)
+            if count >= 2:
+                doubled_black += count
+            if not black_pawns & ADJACENT_FILES[file]:
+                isolated_black += 1
+    return (doubled_white, doubled_black), (isolated_white, isolated_black)
 
 
 def mobility(board: chess.Board) -> tuple[int, int]:
@@ -221,3 +1364,41 @@ def mobility(board: chess.Board) -> tuple[int, int]:
         return current_mobility, opposite_mobility
     else:
         return opposite_mobility, current_mobility
+
+
+def attack_mobility(board: chess.Board) -> tuple[int, int]:
+    """Estimate mobility for both sides from attack bitboards.
+
+    Counts the squares each piece attacks that are not occupied by its own side,
+    plus pawn pushes and pawn captures. Pins, checks and castling are ignored,
+    so this over-counts slightly compared with `mobility`, but it needs no move
+    generation and does not depend on whose turn it is.
+    """
+    occupied = board.occupied
+    counts = []
+    for color in (chess.WHITE, chess.BLACK):
+        own = board.occupied_co[color]
+        enemy = board.occupied_co[not color]
+        count = 0
+        for square in chess.scan_forward(own & ~board.pawns):
+            count += chess.popcount(board.attacks_mask(square) & ~own)
+
+        pawns = board.pawns & own
+        if color == chess.WHITE:
+            single = (pawns << 8) & ~occupied & chess.BB_ALL
+            double = ((single & chess.BB_RANK_3) << 8) & ~occupied
+            left = ((pawns & ~chess.BB_FILE_A) << 7) & enemy
+            right = ((pawns & ~chess.BB_FILE_H) << 9) & enemy
+        else:
+            single = (pawns >> 8) & ~occupied
+            double = ((single & chess.BB_RANK_6) >> 8) & ~occupied
+            left = ((pawns & ~chess.BB_FILE_A) >> 9) & enemy
+            right = ((pawns & ~chess.BB_FILE_H) >> 7) & enemy
+        count += (
+            chess.popcount(single)
+            + chess.popcount(double)
+            + chess.popcount(left)
+            + chess.popcount(right)
+        )
+        counts.append(count)
+    return counts[0], counts[1]
@@ -5,10 +5,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from classical import classical_move
+from book import OpeningBook
+from classical import ClassicalEngine
 from mcts import MCTSAgent
+from ponder import Ponderer, ponder_classical, ponder_mcts, predicted_reply
 from reinforcement import ReinforcementAgent
 from neural import neural_move
+from search_info import SearchInfo
+from tablebase import Tablebase
 
 # Configure logging
 logging.basicConfig(
@@ -16,7 +20,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Wall-clock budget for the classical engine, in seconds
+CLASSICAL_MOVETIME = 3.0
+# Keep searching the expected reply while the human thinks
+PONDER = True
+
 board = chess.Board()
+# Opening moves come from here while the game is in book (None until built)
+book = OpeningBook.open()
+# Syzygy tables for exact endgame play (None when the directory has none)
+tablebase = Tablebase.open()
+# Keeps its transposition table, history and killer moves for the whole game
+classical_engine = ClassicalEngine(book=book, tablebase=tablebase)
+# Keeps its search tree for the whole game
+mcts_agent = MCTSAgent(500, book=book, tablebase=tablebase, reuse_tree=True)
+ponderer = Ponderer()
 
 app = FastAPI()
 
@@ -36,66 +54,116 @@ async def make_uci_move(move: str):
     uci_move = chess.Move.from_uci(move)
     board.push(uci_move)
     logger.info(f"UCI move {move} made. Current board:\n{board}")
+    check_ponder_hit()
 
 
 @app.post("/move-san/{move}")
 async def make_san_move(move: str):
     board.push_san(move)
     logger.info(f"SAN move {move} made. Current board:\n{board}")
+    check_ponder_hit()
 
 
 @app.post("/reset-board")
 async def reset_board():
     global board
+    ponderer.cancel()
+    classical_engine.new_game()
+    mcts_agent.clear_tree()
     board = chess.Board()
     logger.info(f"Board reset. Current board:\n{board}")
 
 
+def check_ponder_hit():
+    """Stop pondering unless the human played the expected move."""
+    if ponderer.board is not None and not ponderer.is_pondering(board):
+        logger.info("Ponder miss")
+        ponderer.cancel()
+
+
+def start_pondering(engine: str, search, search_info: SearchInfo, before: chess.Board):
+    """Search the position after the expected reply to the engine's move."""
+    reply = predicted_reply(before, search_info)
+    if not PONDER or reply is None:
+        return
+    ponder_board = board.copy()
+    ponder_board.push(reply)
+    ponderer.start(engine, ponder_board, search)
+
+
+def move_response(move: str, search_info: SearchInfo, info: bool) -> JSONResponse:
+    """Log the search statistics and include them in the response if asked."""
+    logger.info(f"Search info: {search_info.to_dict()}")
+    content = {"move": move}
+    if info:
+        content["info"] = search_info.to_dict()
+    return JSONResponse(content=content)
+
+
 @app.get("/ai-classical")
-async def ai_classical():
+async def ai_classical(info: bool = False):
     try:
-        move = classical_move(board)
+        before = board.copy()
+        search_info = None
+        if ponderer.is_pondering(board, "classical"):
+            # Ponder hit: the search has been running since the human's turn
+            search_info = ponderer.finish(CLASSICAL_MOVETIME - ponderer.elapsed)
+        else:
+            ponderer.cancel()
+        if search_info is None:
+            # No ponder search, or it failed
+            search_info = classical_engine.search(board, movetime=CLASSICAL_MOVETIME)
+        move = search_info.move
         # Make the move on the backend board
         board.push_san(move)
         logger.info(f"AI classical move {move} made. Current board:\n{board}")
-        return JSONResponse(content={"move": move})
+        start_pondering(
+            "classical", ponder_classical(classical_engine), search_info, before
+        )
+        return move_response(move, search_info, info)
     except Exception as e:
         logger.error(f"Error in ai_classical: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 
 @app.get("/ai-mcts")
-async def ai_mcts():
+async def ai_mcts(info: bool = False):
     try:
-        agent = MCTSAgent(500)
-        move = agent.select_move(board)
+        before = board.copy()
+        # The tree kept from the last move, grown further on a ponder hit
+        ponderer.cancel()
+        move = mcts_agent.select_move(board)
         board.push_san(move)
         logger.info(f"AI MCTS move {move} made. Current board:\n{board}")
-        return JSONResponse(content={"move": move})
+        start_pondering("mcts", ponder_mcts(mcts_agent), mcts_agent.last_info, before)
+        return move_response(move, mcts_agent.last_info, info)
     except Exception as e:
         logger.error(f"Error in ai_mcts: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 
 @app.get("/ai-reinforcement")
-async def ai_reinforcement():
+async def ai_reinforcement(info: bool = False):
     try:
-        agent = ReinforcementAgent()
+        ponderer.cancel()
+        agent = ReinforcementAgent(book=book, tablebase=tablebase)
         move = agent.select_move(board)
         board.push_san(move)
         logger.info(f"AI Reinforcement move {move} made. Current board:\n{board}")
-        return JSONResponse(content={"move": move})
+        return move_response(move, agent.last_info, info)
     except Exception as e:
         logger.error(f"Error in ai_reinfocement: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 @app.get('/ai-neural')
-async def ai_neural():
+async def ai_neural(info: bool = False):
     try:
-        move = neural_move(board)
+        ponderer.cancel()
+        infos = []
+        move = neural_move(board, info_callback=infos.append, book=book)
         board.push_san(move)
         logger.info(f"AI classical move {move} made. Current board:\n{board}")
-        return JSONResponse(content={"move": move})
+        return move_response(move, infos[-1], info)
     except Exception as e:
         logger.error(f"Error in ai_neural: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
\ No newline at end of file
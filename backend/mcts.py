@@ -1,11 +1,39 @@
 import math
+import multiprocessing
 import random
+import threading
+import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
+from multiprocessing import shared_memory
 
 import chess
+import numpy as np
+
+from book import OpeningBook
+from classical import PawnHashTable, SearchState, alpha_beta_max, material_score
+from process_pool import process_pool
+from search_info import SearchInfo
+from tablebase import Tablebase
 
 EXPLORATION_EXPLOITATION_BALANCE = 1
 
+# Legal moves drawn per ply of a bounded playout, the first capture or check
+# among them being played
+PLAYOUT_CANDIDATES = 2
+# Score, in pawns, at which an evaluated leaf is won with probability
+# 1 / (1 + e^-1), about 73%; one pawn up wins about 60%
+PLAYOUT_SCORE_SCALE = 2.5
+# Halfmove clock of the 75-move rule, which ends a game without a claim
+SEVENTY_FIVE_MOVE_PLIES = 150
+# Visits a tree-parallel worker adds along its path before its rollout result
+# is known, so that the other workers see a lower win rate there and spread
+# over different branches
+VIRTUAL_LOSS = 1
+# Nodes reserved per playout of a tree-parallel search; a playout expands at
+# most one node, adding all its children at once
+SHARED_TREE_NODES_PER_PLAYOUT = 40
+
 
 @dataclass
 class Node:
@@ -17,39 +45,347 @@ class Node:
     wins: dict[chess.Color, float] = field(
         default_factory=lambda: {chess.WHITE: 0.0, chess.BLACK: 0.0}
     )
-    unvisited_moves: set[str] = field(default_factory=set)
+    _unvisited_moves: list[chess.Move] | None = field(
+        default=None, init=False, repr=False
+    )
+
+    @property
+    def unvisited_moves(self) -> list[chess.Move]:
+        """Legal moves not expanded yet, in random order. Generated on first use:
+        most nodes get a single rollout and are never expanded."""
+        if self._unvisited_moves is None:
+            self._unvisited_moves = shuffled_moves(self.board)
+        return self._unvisited_moves
 
-    def __post_init__(self):
-        """Called after __init__ sets all fields. Add custom initialization logic here."""
-        for m in self.board.legal_moves:
-            self.unvisited_moves.add(m)
+    @classmethod
+    def root(cls, board: chess.Board) -> "Node":
+        return cls(board.copy(), None)
+
+    @property
+    def turn(self) -> chess.Color:
+        return self.board.turn
 
     def add_child(self, new_board: chess.Board, new_move: chess.Move):
         return Node(new_board, new_move, parent=self)
 
-    def add_random_child(self):
-        new_move = random.choice(list(self.unvisited_moves))
-        self.unvisited_moves.remove(new_move)
+    def add_random_child(self, board: chess.Board | None = None):
+        """Expand a random unvisited move. A `board` at this node, as used by
+        the search to descend, is moved on to the child as well."""
+        new_move = self.unvisited_moves.pop()
         new_board = self.board.copy()
         new_board.push(new_move)
         new_node = self.add_child(new_board, new_move)
         self.children.append(new_node)
+        if board is not None:
+            board.push(new_move)
         return new_node
 
     def record_win(self, winner: chess.Color):
         self.wins[winner] += 1
         self.visits += 1
 
-    def can_add_child(self):
+    def record_result(self, winner: chess.Color | None):
+        if winner is not None:
+            self.record_win(winner)
+        else:
+            # For draws, don't record a win for either side
+            self.visits += 1
+
+    def can_add_child(self, board: chess.Board | None = None):
         return len(self.unvisited_moves) > 0
 
-    def is_terminal(self):
+    def is_terminal(self, board: chess.Board | None = None):
         return self.board.is_game_over()
 
     def win_percent(self, player: chess.Color):
         return self.wins[player] / self.visits
 
 
+@dataclass(slots=True, eq=False)
+class CompactNode:
+    """Search tree node that stores only the move and the statistics.
+
+    Unlike `Node` it holds no board: the search keeps one board, pushing moves
+    on the way down from the root and popping them afterwards, and passes it to
+    the methods that need the position. `wins` is a list indexed by color.
+
+    Once fully expanded, a node also keeps its children's visits and wins (for
+    its side to move) in NumPy arrays, in the order of `children`, so that UCT
+    can score all children at once. Statistics must therefore be updated
+    through `record_win`, `record_result`, `add_visit` and `add_win`.
+    """
+
+    move: chess.Move | None
+    turn: chess.Color
+    parent: "CompactNode | None" = None
+    children: list["CompactNode"] = field(default_factory=list)
+    visits: int = 0
+    wins: list[float] = field(default_factory=lambda: [0.0, 0.0])
+    # Legal moves not expanded yet, in random order; generated on first use
+    unvisited_moves: list[chess.Move] | None = None
+    # Whether the game is over here, decided on the first check
+    terminal: bool | None = None
+    # Position of this node in its parent's child arrays
+    index: int = 0
+    # Per-child statistics, allocated on the first selection, and the
+    # children's visit total
+    child_visits: np.ndarray | None = None
+    child_wins: np.ndarray | None = None
+    children_visits: int = 0
+
+    @classmethod
+    def root(cls, board: chess.Board) -> "CompactNode":
+        return cls(None, board.turn)
+
+    def add_random_child(self, board: chess.Board) -> "CompactNode":
+        """Expand a random unvisited move, pushing it on `board`, which must be
+        at this node."""
+        new_move = self.unvisited_moves.pop()
+        board.push(new_move)
+        new_node = CompactNode(
+            new_move, board.turn, parent=self, index=len(self.children)
+        )
+        self.children.append(new_node)
+        return new_node
+
+    def record_win(self, winner: chess.Color):
+        self.add_win(winner)
+        self.add_visit()
+
+    def record_result(self, winner: chess.Color | None):
+        if winner is not None:
+            self.add_win(winner)
+        self.add_visit()
+
+    def add_visit(self):
+        self.visits += 1
+        parent = self.parent
+        if parent is not None:
+            parent.children_visits += 1
+            if parent.child_visits is not None:
+                parent.child_visits[self.index] += 1
+
+    def add_win(self, winner: chess.Color):
+        self.wins[winner] += 1
+        parent = self.parent
+        if (
+            parent is not None
+            and parent.child_wins is not None
+            and winner == parent.turn
+        ):
+            parent.child_wins[self.index] += 1
+
+    def can_add_child(self, board: chess.Board) -> bool:
+        if self.unvisited_moves is None:
+            self.unvisited_moves = shuffled_moves(board)
+        return len(self.unvisited_moves) > 0
+
+    def child_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """The children's visits and wins, built once the node is fully
+        expanded and kept up to date from then on."""
+        if self.child_visits is None:
+            self.child_visits = np.array(
+                [child.visits for child in self.children], dtype=float
+            )
+            self.child_wins = np.array(
+                [child.wins[self.turn] for child in self.children], dtype=float
+            )
+        return self.child_visits, self.child_wins
+
+    def is_terminal(self, board: chess.Board) -> bool:
+        if self.terminal is None:
+            self.terminal = board.is_game_over()
+        return self.terminal
+
+    def win_percent(self, player: chess.Color) -> float:
+        return self.wins[player] / self.visits
+
+
+def shuffled_moves(board: chess.Board) -> list[chess.Move]:
+    """The legal moves in random order, so that expanding pops from the end."""
+    moves = list(board.legal_moves)
+    random.shuffle(moves)
+    return moves
+
+
+def playout_move(board: chess.Board) -> chess.Move | None:
+    """A random legal move for a playout, or None when there is none.
+
+    Up to `PLAYOUT_CANDIDATES` moves are drawn from the pseudo-legal moves and
+    tested for legality one at a time, and the first capture or check among
+    them is played. Tactical moves are thus more likely than quiet ones,
+    without generating every legal move or testing every move for check.
+    """
+    moves = list(board.generate_pseudo_legal_moves())
+    first = None
+    drawn = 0
+    while moves and drawn < PLAYOUT_CANDIDATES:
+        index = random.randrange(len(moves))
+        move = moves[index]
+        moves[index] = moves[-1]
+        moves.pop()
+        if not board.is_legal(move):
+            continue
+        if board.is_capture(move) or board.gives_check(move):
+            return move
+        if first is None:
+            first = move
+        drawn += 1
+    return first
+
+
+def bounded_playout(
+    board: chess.Board,
+    max_plies: int,
+    evaluate: Callable[[chess.Board], float] = material_score,
+    tablebase: Tablebase | None = None,
+) -> chess.Color | None:
+    """Play at most `max_plies` random moves from `board`, preferring captures
+    and checks, and return the winner, or None for a draw.
+
+    A playout that is cut off scores its last position with `evaluate`, from
+    White's point of view, and draws the winner from that score squashed into
+    a win probability. Repetitions are not detected.
+    """
+    board = board.copy(stack=False)
+    for _ in range(max_plies):
+        if tablebase is not None:
+            known, winner = tablebase.winner(board)
+            if known:
+                return winner
+        if (
+            board.halfmove_clock >= SEVENTY_FIVE_MOVE_PLIES
+            or board.is_insufficient_material()
+        ):
+            return None
+        move = playout_move(board)
+        if move is None:
+            # Checkmate or stalemate
+            return not board.turn if board.is_check() else None
+        board.push(move)
+
+    return sample_winner(win_probability(evaluate(board)))
+
+
+def win_probability(score: float) -> float:
+    """Squash a score in pawns, mates included, into the probability that the
+    side it is scored for wins: the logistic curve, written with tanh so that
+    large scores cannot overflow."""
+    return 0.5 * (1 + math.tanh(score / (2 * PLAYOUT_SCORE_SCALE)))
+
+
+def sample_winner(white_win: float) -> chess.Color:
+    """Draw the winner of an evaluated leaf, White with probability
+    `white_win`. Over many playouts the wins add up to the probabilities."""
+    return chess.WHITE if random.random() < white_win else chess.BLACK
+
+
+def exact_winner(
+    board: chess.Board, tablebase: Tablebase | None = None
+) -> tuple[bool, chess.Color | None]:
+    """Whether the result of `board` is known, because the game is over or the
+    tablebase holds the position, and if so the winner, or None for a draw."""
+    outcome = board.outcome()
+    if outcome is not None:
+        return True, outcome.winner
+    if tablebase is not None:
+        return tablebase.winner(board)
+    return False, None
+
+
+# Estimates the result of the game from a leaf position, optionally using the
+# tablebase: the winner, or None for a draw
+LeafEvaluator = Callable[[chess.Board, Tablebase | None], chess.Color | None]
+
+
+@dataclass
+class RandomPlayout:
+    """Play uniformly random moves until the game ends."""
+
+    def __call__(
+        self, board: chess.Board, tablebase: Tablebase | None = None
+    ) -> chess.Color | None:
+        board = board.copy()
+
+        while True:
+            known, winner = exact_winner(board, tablebase)
+            if known:
+                return winner
+            moves = list(board.legal_moves)
+            move = random.choice(moves)
+            board.push(move)
+
+
+@dataclass
+class BoundedPlayout:
+    """Play at most `plies` random moves, then score the position with
+    `evaluate`, see `bounded_playout`."""
+
+    plies: int = 20
+    evaluate: Callable[[chess.Board], float] = material_score
+
+    def __call__(
+        self, board: chess.Board, tablebase: Tablebase | None = None
+    ) -> chess.Color | None:
+        return bounded_playout(board, self.plies, self.evaluate, tablebase)
+
+
+@dataclass
+class AlphaBetaEvaluator:
+    """Score the leaf with a shallow `alpha_beta_max` on the Shannon score,
+    and draw the winner from the score squashed into a win probability.
+
+    Slower per leaf than a bounded playout but without its noise; quiescence
+    resolves the captures left at the horizon.
+    """
+
+    depth: int = 1
+    quiescence: bool = True
+    # Shared between leaves, most of which keep the same pawns
+    pawn_table: PawnHashTable = field(default_factory=PawnHashTable, repr=False)
+
+    def __call__(
+        self, board: chess.Board, tablebase: Tablebase | None = None
+    ) -> chess.Color | None:
+        known, winner = exact_winner(board, tablebase)
+        if known:
+            return winner
+
+        state = SearchState(
+            root_ply=len(board.move_stack),
+            quiescence=self.quiescence,
+            pawn_table=self.pawn_table,
+            tablebase=tablebase,
+        )
+        score, _ = alpha_beta_max(
+            board, self.depth, -float("inf"), float("inf"), state
+        )
+        if board.turn == chess.BLACK:
+            score = -score
+        return sample_winner(win_probability(score))
+
+
+def uct_scores(
+    wins: np.ndarray, total_rollouts: int, child_rollouts: np.ndarray
+) -> np.ndarray:
+    """`uct` for arrays of children."""
+    if total_rollouts == 0:
+        scores = wins.copy()
+    elif child_rollouts.all():
+        # Usual case, computed in place: a handful of NumPy calls in total
+        scores = math.log(total_rollouts) / child_rollouts
+        np.sqrt(scores, out=scores)
+        scores *= EXPLORATION_EXPLOITATION_BALANCE
+        scores += wins
+        return scores
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            root = np.sqrt(math.log(total_rollouts) / child_rollouts)
+        scores = wins + EXPLORATION_EXPLOITATION_BALANCE * root
+    scores[child_rollouts == 0] = float("inf")
+    return scores
+
+
 def uct(win_pct: float, total_rollouts: int, child_rollouts: int):
     # If child hasn't been visited, give it infinite score to encourage exploration
     if child_rollouts == 0:
@@ -61,31 +397,232 @@ def uct(win_pct: float, total_rollouts: int, child_rollouts: int):
     return win_pct + EXPLORATION_EXPLOITATION_BALANCE * root
 
 
+class SharedTree:
+    """Search tree in flat NumPy arrays over one block of shared memory, which
+    worker processes search together (tree parallelism).
+
+    Node 0 is the root. The children of a node are stored next to each other
+    from `first_child`, which is -1 until the node is expanded. A node is
+    expanded, with all its children in random order, on the first playout that
+    passes through it after its own. `wins` is indexed by node and color, and
+    moves are packed as from | to << 6 | promotion << 12.
+
+    The arrays are not synchronized: processes update them under a shared
+    lock, see `search`. Pass `name` to attach to a tree created by another
+    process; the creator `unlink`s it after every process has `close`d it.
+    """
+
+    # Fields of `counters`: nodes in use, playouts not started yet and the
+    # deepest node reached
+    SIZE, REMAINING, MAX_DEPTH = range(3)
+
+    def __init__(self, capacity: int, name: str | None = None):
+        self.capacity = capacity
+        # Counters, then visits and wins (8 bytes each), then first child,
+        # child count and move (4 bytes each)
+        size = 3 * 8 + capacity * (3 * 8 + 3 * 4)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name, track=False)
+        offset = 0
+
+        def view(dtype: type, shape: int | tuple[int, ...]) -> np.ndarray:
+            nonlocal offset
+            array = np.ndarray(shape, dtype, buffer=self.shm.buf, offset=offset)
+            offset += array.nbytes
+            return array
+
+        self.counters = view(np.int64, 3)
+        self.visits = view(np.int64, capacity)
+        self.wins = view(np.float64, (capacity, 2))
+        self.first_child = view(np.int32, capacity)
+        self.child_count = view(np.int32, capacity)
+        self.moves = view(np.int32, capacity)
+        if name is None:
+            self.counters[self.SIZE] = 1
+            self.first_child[0] = -1
+
+    @property
+    def size(self) -> int:
+        return int(self.counters[self.SIZE])
+
+    @property
+    def max_depth(self) -> int:
+        return int(self.counters[self.MAX_DEPTH])
+
+    def close(self):
+        """Drop this process's views of the arrays and detach from the block."""
+        del self.counters, self.visits, self.wins
+        del self.first_child, self.child_count, self.moves
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+    def move(self, node: int) -> chess.Move:
+        code = int(self.moves[node])
+        return chess.Move(code & 63, code >> 6 & 63, code >> 12 or None)
+
+    def expand(self, node: int, board: chess.Board) -> bool:
+        """Add the children of `node`, the node for `board`, or none if the
+        game is over. Returns False, adding nothing, when the tree is full."""
+        moves = [] if board.is_game_over() else shuffled_moves(board)
+        start = self.size
+        end = start + len(moves)
+        if end > self.capacity:
+            return False
+        self.moves[start:end] = [
+            move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+            for move in moves
+        ]
+        self.first_child[start:end] = -1
+        self.first_child[node] = start
+        self.child_count[node] = len(moves)
+        self.counters[self.SIZE] = end
+        return True
+
+    def select_leaf(self, board: chess.Board) -> list[int]:
+        """Descend by UCT from the root, the node for `board`, to a node not
+        played out yet or where the game is over, expanding on the way and
+        pushing the moves on `board`. Returns the nodes on the path."""
+        node = 0
+        path = [0]
+        while True:
+            if self.first_child[node] < 0:
+                # A full tree leaves the node unexpanded and plays it out again
+                if (node != 0 and self.visits[node] == 0) or not self.expand(node, board):
+                    break
+            first = int(self.first_child[node])
+            count = int(self.child_count[node])
+            if count == 0:
+                break
+            children = slice(first, first + count)
+            scores = uct_scores(
+                self.wins[children, int(board.turn)],
+                int(self.visits[node]),
+                self.visits[children],
+            )
+            node = first + int(scores.argmax())
+            board.push(self.move(node))
+            path.append(node)
+        self.counters[self.MAX_DEPTH] = max(self.max_depth, len(path) - 1)
+        return path
+
+    def add_virtual_loss(self, path: list[int]):
+        self.visits[path] += VIRTUAL_LOSS
+
+    def record_result(self, path: list[int], winner: chess.Color | None):
+        """Turn the virtual loss on `path` into one visit and add the result."""
+        self.visits[path] -= VIRTUAL_LOSS - 1
+        if winner is not None:
+            self.wins[path, int(winner)] += 1
+
+    def search(
+        self,
+        board: chess.Board,
+        num_rounds: int,
+        workers: int,
+        evaluator: LeafEvaluator,
+    ):
+        """Play `num_rounds` playouts from the root, the node for `board`, on
+        `workers` processes, scoring leaves with `evaluator`."""
+        context = multiprocessing.get_context()
+        lock = context.Lock()
+        self.counters[self.REMAINING] = num_rounds
+        seed = random.getrandbits(32)
+        processes = [
+            context.Process(
+                target=_search_shared_tree,
+                args=(self.shm.name, self.capacity, lock, board, evaluator, seed + worker),
+                daemon=True,
+            )
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        if any(process.exitcode for process in processes):
+            raise RuntimeError("A tree-parallel MCTS worker failed")
+
+    def principal_variation(self, board: chess.Board) -> tuple[list[chess.Move], float]:
+        """The root child with the best win rate for the side to move on
+        `board`, followed by the most visited line below it, and that win
+        rate."""
+        first = int(self.first_child[0])
+        count = int(self.child_count[0])
+        visits = self.visits[first : first + count]
+        wins = self.wins[first : first + count, int(board.turn)]
+        rates = np.where(visits > 0, wins / np.maximum(visits, 1), -1.0)
+        node = first + int(rates.argmax())
+        line = [self.move(node)]
+        while self.first_child[node] >= 0 and self.child_count[node] > 0:
+            first = int(self.first_child[node])
+            child = first + int(self.visits[first : first + self.child_count[node]].argmax())
+            if self.visits[child] == 0:
+                break
+            node = child
+            line.append(self.move(node))
+        return line, float(rates.max())
+
+
 @dataclass
 class MCTSAgent:
     num_rounds: int = 500
-    node_type: type = Node
-
-    def select_move(self, board) -> chess.Move:
-        root = self.node_type(board, None)
+    node_type: type = CompactNode
+    # Called with the statistics of every search
+    info_callback: Callable[[SearchInfo], None] | None = None
+    last_info: SearchInfo | None = field(default=None, init=False)
+    # Positions in the book are answered from it without searching
+    book: OpeningBook | None = None
+    # Endgames it covers are answered from it, and end rollouts early
+    tablebase: Tablebase | None = None
+    # Keep the tree between moves of a game and continue from the subtree of
+    # the position reached
+    reuse_tree: bool = False
+    # Processes running independent searches of num_rounds each, merged at the
+    # root (root parallelism). The kept tree is not used when above 1.
+    workers: int = 1
+    # Processes sharing one tree in shared memory, which play num_rounds
+    # playouts between them (tree parallelism), see SharedTree. The kept tree
+    # is not used when above 1.
+    tree_workers: int = 1
+    # Estimates the result from each new leaf: RandomPlayout, BoundedPlayout,
+    # AlphaBetaEvaluator or reinforcement.NeuralEvaluator
+    evaluator: LeafEvaluator = field(default_factory=RandomPlayout)
+    # Root of the kept tree, the starting position of its game and the moves
+    # played from there
+    tree: tuple[Node, str, list[chess.Move]] | None = field(
+        default=None, init=False, repr=False
+    )
 
-        for _ in range(self.num_rounds):
-            node = root
-            while (not node.can_add_child()) and (not node.is_terminal()):
-                node = self.select_child(node)
+    def select_move(self, board, root: Node | None = None) -> chess.Move:
+        """Search `board` for num_rounds playouts and return the best move in SAN.
 
-            if node.can_add_child():
-                node = node.add_random_child()
+        A `root` searched earlier for the same position, e.g. while pondering,
+        or the subtree kept from the previous move is searched further, counting
+        its earlier playouts towards num_rounds.
+        """
+        for source in (self.book, self.tablebase):
+            if source is not None and (info := source.search(board)) is not None:
+                self.last_info = info
+                if self.info_callback is not None:
+                    self.info_callback(info)
+                return info.move
 
-            winner = self.rollout(node.board)
-
-            while node is not None:
-                if winner is not None:
-                    node.record_win(winner)
-                else:
-                    # For draws, don't record a win for either side
-                    node.visits += 1
-                node = node.parent
+        start = time.perf_counter()
+        if self.workers > 1 and root is None:
+            return self.select_move_parallel(board, start)
+        if self.tree_workers > 1 and root is None:
+            return self.select_move_tree_parallel(board, start)
+        if root is None:
+            root = self.tree_root(board)
+        nodes = 0 if root.visits else 1
+        added, max_depth = self.search(
+            root, board, max(0, self.num_rounds - root.visits)
+        )
+        nodes += added
 
         best_move = None
         best_score = -float('inf')
@@ -95,31 +632,261 @@ class MCTSAgent:
                 best_move = child.move
                 best_score = child_score
 
+        self.last_info = self.search_info(board, root, best_move, best_score)
+        self.last_info.nodes = nodes
+        self.last_info.depth = max_depth
+        self.last_info.time = time.perf_counter() - start
+        if self.info_callback is not None:
+            self.info_callback(self.last_info)
         return board.san(best_move)
 
+    def select_move_parallel(self, board: chess.Board, start: float) -> str:
+        """Merge the root statistics of `workers` independent searches and
+        return the move with the best combined win rate."""
+        pool = process_pool(self.workers)
+        seed = random.getrandbits(32)
+        futures = [
+            pool.submit(
+                _search_root_stats,
+                type(self),
+                board,
+                self.num_rounds,
+                seed + worker,
+                node_type=self.node_type,
+                evaluator=self.evaluator,
+            )
+            for worker in range(self.workers)
+        ]
+        visits: dict[chess.Move, int] = {}
+        scores: dict[chess.Move, float] = {}
+        nodes = max_depth = 0
+        for future in futures:
+            stats, worker_nodes, worker_depth = future.result()
+            for move, move_visits, move_score in stats:
+                visits[move] = visits.get(move, 0) + move_visits
+                scores[move] = scores.get(move, 0.0) + move_score
+            nodes += worker_nodes
+            max_depth = max(max_depth, worker_depth)
+
+        best_move = max(visits, key=lambda move: scores[move] / visits[move])
+        san = board.san(best_move)
+        self.last_info = SearchInfo(
+            engine="mcts",
+            move=san,
+            score=scores[best_move] / visits[best_move],
+            depth=max_depth,
+            nodes=nodes,
+            time=time.perf_counter() - start,
+            pv=[san],
+            playouts=sum(visits.values()),
+        )
+        if self.info_callback is not None:
+            self.info_callback(self.last_info)
+        return san
+
+    def select_move_tree_parallel(self, board: chess.Board, start: float) -> str:
+        """Search `board` with `tree_workers` processes sharing one tree and
+        return the root move with the best win rate."""
+        tree = SharedTree(1 + self.num_rounds * SHARED_TREE_NODES_PER_PLAYOUT)
+        try:
+            tree.search(board, self.num_rounds, self.tree_workers, self.evaluator)
+            line, score = tree.principal_variation(board)
+            nodes, max_depth, playouts = tree.size, tree.max_depth, int(tree.visits[0])
+        finally:
+            tree.close()
+            tree.unlink()
+
+        pv_board = board.copy(stack=False)
+        pv = []
+        for move in line:
+            pv.append(pv_board.san(move))
+            pv_board.push(move)
+        self.last_info = SearchInfo(
+            engine="mcts",
+            move=pv[0],
+            score=score,
+            depth=max_depth,
+            nodes=nodes,
+            time=time.perf_counter() - start,
+            pv=pv,
+            playouts=playouts,
+        )
+        if self.info_callback is not None:
+            self.info_callback(self.last_info)
+        return pv[0]
+
+    def tree_root(self, board: chess.Board) -> Node:
+        """The node for `board` in the kept tree, found by following the moves
+        played since its root, or a new root when there is none.
+
+        The node becomes the new root; the rest of the old tree is dropped.
+        """
+        node = None
+        start_fen = board.root().fen()
+        if self.tree is not None:
+            node, tree_start_fen, stack = self.tree
+            if tree_start_fen != start_fen or board.move_stack[: len(stack)] != stack:
+                node = None
+            for move in board.move_stack[len(stack):]:
+                if node is None:
+                    break
+                node = next((child for child in node.children if child.move == move), None)
+        if node is None:
+            node = self.node_type.root(board)
+        node.parent = None
+        if self.reuse_tree:
+            self.tree = (node, start_fen, list(board.move_stack))
+        return node
+
+    def clear_tree(self):
+        self.tree = None
+
+    def search(
+        self,
+        root: Node,
+        board: chess.Board,
+        num_rounds: int,
+        stop: threading.Event | None = None,
+        deadline: float | None = None,
+    ) -> tuple[int, int]:
+        """Run up to `num_rounds` playouts from `root`, the node for `board`,
+        ending early once `stop` is set or `time.monotonic()` passes
+        `deadline`. Returns the number of nodes added and the deepest node
+        reached.
+        """
+        board = board.copy()
+        nodes = 0
+        max_depth = 0
+        for _ in range(num_rounds):
+            if stop is not None and stop.is_set():
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            node, depth, added = self.select_leaf(root, board)
+            nodes += added
+            max_depth = max(max_depth, depth)
+
+            winner = self.rollout(board)
+            for _ in range(depth):
+                board.pop()
+
+            while node is not None:
+                node.record_result(winner)
+                node = node.parent
+        return nodes, max_depth
+
+    def select_leaf(self, root: Node, board: chess.Board) -> tuple[Node, int, bool]:
+        """Descend from `root` to a node with unexpanded moves and expand one,
+        pushing the moves on `board`. Returns the node reached, its depth and
+        whether it was added."""
+        node = root
+        depth = 0
+        while (not node.can_add_child(board)) and (not node.is_terminal(board)):
+            node = self.select_child(node)
+            board.push(node.move)
+            depth += 1
+
+        if node.can_add_child(board):
+            return node.add_random_child(board), depth + 1, True
+        return node, depth, False
+
+    def search_info(
+        self, board: chess.Board, root: Node, best_move: chess.Move, best_score: float
+    ) -> SearchInfo:
+        """Statistics of the search that just ran from `root`."""
+        pv = [board.san(best_move)]
+        pv_board = board.copy(stack=False)
+        pv_board.push(best_move)
+        node = next(child for child in root.children if child.move == best_move)
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            pv.append(pv_board.san(node.move))
+            pv_board.push(node.move)
+        return SearchInfo(
+            engine="mcts",
+            move=pv[0],
+            score=best_score,
+            pv=pv,
+            playouts=root.visits,
+        )
+
     def select_child(self, node: Node) -> Node:
+        if isinstance(node, CompactNode):
+            # Only fully expanded nodes are selected from, so the children
+            # no longer change once the arrays exist
+            visits, wins = node.child_arrays()
+            scores = uct_scores(wins, node.children_visits, visits)
+            return node.children[int(scores.argmax())]
+
         total_rollouts = sum(child.visits for child in node.children)
         best_node = None
         best_score = -float("inf")
 
         for child in node.children:
-            child_score = uct(child.wins[node.board.turn], total_rollouts, child.visits)
+            child_score = uct(child.wins[node.turn], total_rollouts, child.visits)
             if child_score > best_score:
                 best_node = child
                 best_score = child_score
         return best_node
 
     def rollout(self, board: chess.Board) -> chess.Color | None:
-        board = board.copy()
+        return self.evaluator(board, self.tablebase)
 
-        while not board.is_game_over():
-            moves = list(board.legal_moves)
-            move = random.choice(moves)
-            board.push(move)
 
-        outcome = board.outcome()
-        if outcome is None:
-            return None
-        
-        # Return the winner, or None for draws
-        return outcome.winner
+def _search_root_stats(
+    agent_type: type,
+    board: chess.Board,
+    num_rounds: int,
+    seed: int,
+    **settings,
+) -> tuple[list[tuple[chess.Move, int, float]], int, int]:
+    """Run one search of a root-parallel MCTS in a worker process, with an
+    agent built from the given `settings` fields.
+
+    Returns (move, visits, win rate times visits for the side to move) for each
+    root child, the number of nodes added and the deepest node reached.
+    """
+    random.seed(seed)
+    agent = agent_type(num_rounds, **settings)
+    root = agent.node_type.root(board)
+    nodes, max_depth = agent.search(root, board, num_rounds)
+    stats = [
+        (child.move, child.visits, child.win_percent(board.turn) * child.visits)
+        for child in root.children
+    ]
+    return stats, nodes + 1, max_depth
+
+
+def _search_shared_tree(
+    name: str,
+    capacity: int,
+    lock: "multiprocessing.synchronize.Lock",
+    board: chess.Board,
+    evaluator: LeafEvaluator,
+    seed: int,
+):
+    """Play playouts on the `SharedTree` in the shared memory block `name`, in a
+    worker process, until none are left.
+
+    Selection, expansion and backpropagation hold `lock`; the rollout runs
+    outside it, with a virtual loss on its path until the result is in.
+    """
+    random.seed(seed)
+    tree = SharedTree(capacity, name)
+    try:
+        while True:
+            with lock:
+                if tree.counters[SharedTree.REMAINING] == 0:
+                    break
+                tree.counters[SharedTree.REMAINING] -= 1
+                path = tree.select_leaf(board)
+                tree.add_virtual_loss(path)
+
+            winner = evaluator(board, None)
+            for _ in range(len(path) - 1):
+                board.pop()
+
+            with lock:
+                tree.record_result(path, winner)
+    finally:
+        tree.close()
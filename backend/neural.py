@@ -1,3 +1,5 @@
+import time
+from collections.abc import Callable
 from pathlib import Path
 import chess
 import numpy as np
@@ -5,6 +7,8 @@ import torch
 
 from training.encoder import decode_move, encode_board, encode_move
 from training.simple_model import SimpleModel
+from book import OpeningBook
+from search_info import SearchInfo
 
 device = "mps" if torch.backends.mps.is_available() else "cpu"
 model = SimpleModel().to(device)
@@ -14,7 +18,17 @@ model.load_state_dict(state_dict)
 model.eval()
 
 
-def neural_move(board: chess.Board) -> str:
+def neural_move(
+    board: chess.Board,
+    info_callback: Callable[[SearchInfo], None] | None = None,
+    book: OpeningBook | None = None,
+) -> str:
+    if book is not None and (info := book.search(board)) is not None:
+        if info_callback is not None:
+            info_callback(info)
+        return info.move
+
+    start = time.perf_counter()
     board_enc = encode_board(board)
     board_enc = torch.from_numpy(board_enc).unsqueeze(0).to(device)
     _, model_moves = model(board_enc)
@@ -28,5 +42,19 @@ def neural_move(board: chess.Board) -> str:
     move_candidates = torch.where(legal_moves, model_moves, -float("inf"))
     probs = torch.softmax(move_candidates, dim=-1)
     move = torch.multinomial(probs, 1).item()
+    san = board.san(decode_move(move))
 
-    return board.san(decode_move(move))
+    if info_callback is not None:
+        info_callback(
+            SearchInfo(
+                engine="neural",
+                move=san,
+                score=probs[0, move].item(),  # Policy probability of the move
+                depth=1,
+                nodes=1,
+                time=time.perf_counter() - start,
+                pv=[san],
+                nn_evals=1,
+            )
+        )
+    return san
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import chess
+
+from classical import MAX_SEARCH_DEPTH, ClassicalEngine
+from mcts import MCTSAgent, Node
+from search_info import SearchInfo
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the playouts of one MCTS ponder search, to bound its tree size
+MAX_PONDER_PLAYOUTS = 100_000
+# Seconds after which a ponder search stops on its own, so that a game
+# abandoned mid-ponder does not keep a core busy
+MAX_PONDER_TIME = 120.0
+
+
+class Ponderer:
+    """Searches the position after the expected reply on a background thread
+    while the opponent is thinking.
+
+    `start` launches `search(board, stop)` on a copy of the board; the search
+    must return once the `stop` event is set. When the opponent plays the
+    expected move, `finish` lets the search run on for up to the remaining
+    think time and returns its result, or None if the search raised. Any
+    other move calls `cancel`.
+    """
+
+    def __init__(self):
+        self.engine: str | None = None
+        self.board: chess.Board | None = None
+        self.result: Any = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._started = 0.0
+
+    def start(
+        self,
+        engine: str,
+        board: chess.Board,
+        search: Callable[[chess.Board, threading.Event], Any],
+    ) -> None:
+        self.cancel()
+        self.engine = engine
+        self.board = board.copy()
+        self.result = None
+        self._stop = threading.Event()
+        self._started = time.monotonic()
+        search_board = board.copy()
+
+        def run():
+            try:
+                self.result = search(search_board, self._stop)
+            except Exception:
+                logger.exception(f"Pondering {engine} failed")
+
+        self._thread = threading.Thread(target=run, name="ponder", daemon=True)
+        self._thread.start()
+        logger.info(f"Pondering {engine} on {board.fen()}")
+
+    def is_pondering(self, board: chess.Board, engine: str | None = None) -> bool:
+        """Whether the background search is for the position on `board` (and
+        for `engine`, if given)."""
+        return (
+            self.board is not None
+            and self.board.fen() == board.fen()
+            and (engine is None or engine == self.engine)
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started if self.board is not None else 0.0
+
+    def finish(self, timeout: float | None = 0.0) -> Any:
+        """Let the search run for up to `timeout` more seconds, then stop it and
+        return its result."""
+        if self._thread is None:
+            return None
+        if timeout is None or timeout > 0:
+            self._thread.join(timeout)
+        self._stop.set()
+        self._thread.join()
+        result = self.result
+        logger.info(f"Pondered for {self.elapsed:.2f}s")
+        self._thread, self.engine, self.board, self.result = None, None, None, None
+        return result
+
+    def cancel(self) -> None:
+        """Stop the search and discard its result."""
+        self.finish()
+
+
+def predicted_reply(board: chess.Board, info: SearchInfo | None) -> chess.Move | None:
+    """The opponent's expected reply: the second move of the principal variation.
+
+    `board` is the position before the engine's move `info.pv[0]`.
+    """
+    if info is None or len(info.pv) < 2:
+        return None
+    board = board.copy(stack=False)
+    board.push_san(info.pv[0])
+    return board.parse_san(info.pv[1])
+
+
+def ponder_classical(
+    engine: ClassicalEngine,
+) -> Callable[[chess.Board, threading.Event], SearchInfo]:
+    """A ponder search that fills the tables of `engine`, for at most
+    `MAX_PONDER_TIME` seconds."""
+
+    def search(board: chess.Board, stop: threading.Event) -> SearchInfo:
+        return engine.search(
+            board, MAX_SEARCH_DEPTH, movetime=MAX_PONDER_TIME, stop=stop
+        )
+
+    return search
+
+
+def ponder_mcts(agent: MCTSAgent) -> Callable[[chess.Board, threading.Event], Node]:
+    """A ponder search for an MCTS agent that returns the grown search tree,
+    after at most `MAX_PONDER_PLAYOUTS` playouts or `MAX_PONDER_TIME` seconds.
+
+    An agent that keeps its tree grows the subtree of the expected reply in
+    place, so the other replies are still there on a ponder miss.
+    """
+
+    def search(board: chess.Board, stop: threading.Event) -> Node:
+        root = None
+        if agent.reuse_tree and board.move_stack:
+            before = board.copy()
+            reply = before.pop()
+            parent = agent.tree_root(before)
+            root = next(
+                (child for child in parent.children if child.move == reply), None
+            )
+        deadline = time.monotonic() + MAX_PONDER_TIME
+        if root is None:
+            root = agent.tree_root(board)
+        agent.search(root, board, MAX_PONDER_PLAYOUTS, stop, deadline)
+        return root
+
+    return search
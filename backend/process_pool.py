@@ -0,0 +1,11 @@
+from concurrent.futures import ProcessPoolExecutor
+
+# Process pools are expensive to start, so one is kept per worker count and
+# shared by the engines
+_process_pools: dict[int, ProcessPoolExecutor] = {}
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    if workers not in _process_pools:
+        _process_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _process_pools[workers]
@@ -3,7 +3,8 @@ from pathlib import Path
 import chess
 import chess.polyglot
 import math
-from mcts import Node, MCTSAgent
+from mcts import Node, MCTSAgent, exact_winner, sample_winner
+from tablebase import Tablebase
 import torch
 from training.simple_model import SimpleModel
 from training.encoder import encode_board, encode_move
@@ -14,13 +15,41 @@ EXPLORATION_EXPLOITATION_BALANCE = 1
 @dataclass
 class ReinforcementNode(Node):
     wins: float = 0
+    # Position of this node in its parent's child arrays
+    index: int = 0
+    # Per-child visits, value sums and priors, gathered on the first selection
+    # (once the node is fully expanded), and the children's visit total
+    child_visits: np.ndarray | None = None
+    child_values: np.ndarray | None = None
+    priors: np.ndarray | None = None
+    children_visits: int = 0
 
     def add_child(self, new_board: chess.Board, new_move: chess.Move):
-        return ReinforcementNode(new_board, new_move, parent=self)
+        return ReinforcementNode(
+            new_board, new_move, parent=self, index=len(self.children)
+        )
 
     def record_win(self, value: float):
         self.wins += value
 
+    def record_result(self, value: float):
+        self.wins += value
+        self.visits += 1
+        parent = self.parent
+        if parent is not None:
+            parent.children_visits += 1
+            if parent.child_visits is not None:
+                parent.child_visits[self.index] += 1
+                parent.child_values[self.index] += value
+
+    def gather_child_arrays(self, policy: np.ndarray):
+        """Copy the children's statistics into arrays, kept up to date by
+        `record_result` from then on, and their priors from `policy`."""
+        children = self.children
+        self.child_visits = np.array([child.visits for child in children], dtype=float)
+        self.child_values = np.array([child.wins for child in children], dtype=float)
+        self.priors = policy[[encode_move(child.move) for child in children]]
+
     def win_percent(self, color: chess.Color):
         same_color = 1 if color == chess.WHITE else -1
         if self.visits == 0:
@@ -47,6 +76,46 @@ def puct(win_pct: float, prediction: float, total_rollouts: int, child_rollouts:
     root = math.sqrt(math.log(total_rollouts))
     return win_pct + EXPLORATION_EXPLOITATION_BALANCE * prediction * root / (1 + child_rollouts)
 
+
+def puct_scores(
+    win_pcts: np.ndarray,
+    predictions: np.ndarray,
+    total_rollouts: int,
+    child_rollouts: np.ndarray,
+) -> np.ndarray:
+    """`puct` for arrays of children."""
+    if total_rollouts == 0:
+        return win_pcts
+    root = math.sqrt(math.log(total_rollouts))
+    return win_pcts + EXPLORATION_EXPLOITATION_BALANCE * predictions * root / (1 + child_rollouts)
+
+
+def network_value(model: SimpleModel, board: chess.Board) -> float:
+    """The value head's estimate for `board`, from White's point of view, in [-1, 1]."""
+    board_enc = encode_board(board)
+    board_enc = torch.from_numpy(board_enc).unsqueeze(0).to(device)
+    with torch.no_grad():
+        value, _ = model(board_enc)
+    return value.item()
+
+
+@dataclass
+class NeuralEvaluator:
+    """Leaf evaluator for `MCTSAgent` from the value head of the model, for
+    plain UCT search without `ReinforcementAgent`'s PUCT selection. The value
+    is mapped linearly to White's win probability."""
+
+    model: SimpleModel = model
+    evals: int = 0
+
+    def __call__(self, board: chess.Board, tablebase: Tablebase | None = None) -> chess.Color | None:
+        known, winner = exact_winner(board, tablebase)
+        if known:
+            return winner
+        self.evals += 1
+        return sample_winner((network_value(self.model, board) + 1) / 2)
+
+
 memo = {}
 MAX_MEMO_SIZE = 100000  # Limit memo size to prevent memory bloat
 
@@ -65,42 +134,54 @@ class ReinforcementAgent(MCTSAgent):
             self.model = old_model
         else:
             self.model = model
+        self.nn_evals = 0
+
+    def select_move(self, board, root=None) -> chess.Move:
+        self.nn_evals = 0
+        return super().select_move(board, root)
 
-    def select_child(self, node: Node) -> Node:
+    def search_info(self, board, root, best_move, best_score):
+        info = super().search_info(board, root, best_move, best_score)
+        info.engine = "reinforcement"
+        info.nn_evals = self.nn_evals
+        return info
+
+    def policy(self, board: chess.Board) -> np.ndarray:
+        """Move probabilities from the model over the 4096 move encodings,
+        zero for illegal moves, memoized by position."""
         clear_memo_if_needed()
-        key = chess.polyglot.zobrist_hash(node.board)
+        key = chess.polyglot.zobrist_hash(board)
         if key not in memo:
-            board_enc = encode_board(node.board)
+            board_enc = encode_board(board)
             board_enc = torch.from_numpy(board_enc).unsqueeze(0).to(device)
             with torch.no_grad():
                 _, model_moves = self.model(board_enc)
+            self.nn_evals += 1
             model_moves = model_moves.squeeze(0)
 
             legal_moves = np.zeros(4096, dtype=np.bool)
-            for move in node.board.legal_moves:
+            for move in board.legal_moves:
                 move_enc = encode_move(move)
                 legal_moves[move_enc] = True
             legal_moves = torch.from_numpy(legal_moves).to(device)
 
             move_candidates = torch.where(legal_moves, model_moves, -float("inf"))
             probs = torch.softmax(move_candidates, dim=-1)
-
-            memo[key] = probs
-        
-        probs = memo[key]
-
-        total_rollouts = sum(child.visits for child in node.children)
-        best_node = None
-        best_score = -float("inf")
-
-        for child in node.children:
-            move_enc = encode_move(child.move)
-            child_score = puct(child.win_percent(child.board.turn), probs[move_enc], total_rollouts, child.visits)
-            if child_score > best_score:
-                best_node = child
-                best_score = child_score
-
-        return best_node
+            memo[key] = probs.cpu().numpy()
+        return memo[key]
+
+    def select_child(self, node: ReinforcementNode) -> ReinforcementNode:
+        # Only fully expanded nodes are selected from, so the children no
+        # longer change once the arrays exist
+        if node.priors is None:
+            node.gather_child_arrays(self.policy(node.board))
+        # As win_percent(child.board.turn): values are from White's side
+        sign = 1 if node.board.turn == chess.BLACK else -1
+        win_pcts = sign * node.child_values / np.maximum(node.child_visits, 1)
+        scores = puct_scores(
+            win_pcts, node.priors, node.children_visits, node.child_visits
+        )
+        return node.children[int(scores.argmax())]
 
     def rollout(self, board: chess.Board) -> float:
         if board.is_game_over():
@@ -109,8 +190,9 @@ class ReinforcementAgent(MCTSAgent):
                 return 0  # Draw
             # Return +1 for White win, -1 for Black win
             return 1.0 if winner == chess.WHITE else -1.0
-        board_enc = encode_board(board)
-        board_enc = torch.from_numpy(board_enc).unsqueeze(0).to(device)
-        with torch.no_grad():
-            value, _ = self.model(board_enc)
-        return value.item()
\ No newline at end of file
+        if self.tablebase is not None and (wdl := self.tablebase.wdl(board)) is not None:
+            # Exact result, from White's point of view like the network's value
+            value = wdl / 2
+            return value if board.turn == chess.WHITE else -value
+        self.nn_evals += 1
+        return network_value(self.model, board)
\ No newline at end of file
@@ -0,0 +1,36 @@
+import math
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class SearchInfo:
+    """Statistics about one engine search, filled in by every engine.
+
+    Fields that do not apply to an engine stay at zero, e.g. `playouts` for the
+    classical search or `tt_hits` for MCTS.
+    """
+
+    engine: str
+    move: str | None = None  # SAN of the chosen move
+    score: float | None = None  # Classical: pawns; MCTS: win rate of the move
+    depth: int = 0
+    nodes: int = 0
+    time: float = 0.0  # Seconds
+    pv: list[str] = field(default_factory=list)  # Principal variation in SAN
+    tt_probes: int = 0
+    tt_hits: int = 0
+    cutoffs: int = 0
+    playouts: int = 0
+    nn_evals: int = 0
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.time if self.time > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        """JSON-safe dictionary; mate scores become "mate" or "-mate"."""
+        info = asdict(self)
+        if self.score is not None and not math.isfinite(self.score):
+            info["score"] = "mate" if self.score > 0 else "-mate"
+        info["nps"] = self.nps
+        return info
@@ -0,0 +1,134 @@
+import logging
+import time
+from pathlib import Path
+
+import chess
+import chess.syzygy
+
+from search_info import SearchInfo
+
+logger = logging.getLogger(__name__)
+
+# Directory of Syzygy .rtbw/.rtbz files, e.g. the 3-4-5 piece set
+TABLEBASE_PATH = Path("syzygy")
+
+# Score of a tablebase win: above any evaluation, below a mate (infinity)
+TB_WIN_SCORE = 1000.0
+
+
+class Tablebase:
+    """Syzygy endgame tablebases in a local directory.
+
+    Positions with at most `max_pieces` pieces and no castling rights have
+    exact results. Cursed wins and blessed losses, which the fifty-move rule
+    turns into draws, count as draws.
+    """
+
+    def __init__(self, directory: Path = TABLEBASE_PATH):
+        self.tablebase = chess.syzygy.open_tablebase(str(directory))
+        # Table names are the pieces of both sides, e.g. "KRvK"
+        self.max_pieces = max((len(name) - 1 for name in self.tablebase.wdl), default=0)
+        self.probes = 0
+        self.hits = 0
+
+    @classmethod
+    def open(cls, directory: Path = TABLEBASE_PATH) -> "Tablebase | None":
+        """The tablebase in `directory`, or None if it holds no tables."""
+        if not Path(directory).is_dir():
+            logger.info(f"No tablebase directory at {directory}")
+            return None
+        tablebase = cls(directory)
+        if tablebase.max_pieces == 0:
+            tablebase.close()
+            return None
+        return tablebase
+
+    def covers(self, board: chess.Board) -> bool:
+        return (
+            chess.popcount(board.occupied) <= self.max_pieces
+            and not board.castling_rights
+        )
+
+    def wdl(self, board: chess.Board) -> int | None:
+        """Win (2), draw (0) or loss (-2) for the side to move, or None when
+        the position is not in the tablebase."""
+        if not self.covers(board):
+            return None
+        self.probes += 1
+        wdl = self.tablebase.get_wdl(board)
+        if wdl is None:
+            return None
+        self.hits += 1
+        return wdl if abs(wdl) == 2 else 0
+
+    def winner(self, board: chess.Board) -> tuple[bool, chess.Color | None]:
+        """Whether `board` is in the tablebase, and if so the winner with best
+        play, or None for a draw."""
+        wdl = self.wdl(board)
+        if wdl is None:
+            return False, None
+        if wdl == 0:
+            return True, None
+        return True, board.turn if wdl > 0 else not board.turn
+
+    def score(self, board: chess.Board, ply: int = 0) -> float | None:
+        """Search score for the side to move. Wins found closer to the root
+        score higher, so the search heads for the quickest one."""
+        wdl = self.wdl(board)
+        if wdl is None:
+            return None
+        if wdl == 0:
+            return 0.0
+        return (TB_WIN_SCORE - ply) if wdl > 0 else -(TB_WIN_SCORE - ply)
+
+    def best_move(self, board: chess.Board) -> tuple[chess.Move, int] | None:
+        """The move that keeps the best result and, when winning, resets the
+        fifty-move counter or reaches a zeroing move soonest (by DTZ).
+
+        Returns the move and the result it keeps, or None if any position after
+        a legal move is missing from the tablebase.
+        """
+        if not self.covers(board):
+            return None
+        best = None
+        best_key = None
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            try:
+                if board.is_checkmate():
+                    wdl, dtz = 2, 0
+                elif board.is_insufficient_material():  # No tables for bare kings
+                    wdl, dtz = 0, 0
+                else:
+                    wdl = -self.tablebase.probe_wdl(board)
+                    dtz = 0 if zeroing else abs(self.tablebase.probe_dtz(board))
+            except KeyError:
+                return None
+            finally:
+                board.pop()
+            wdl = wdl if abs(wdl) == 2 else 0
+            # Win quickly, lose slowly
+            key = (wdl, -dtz if wdl > 0 else dtz)
+            if best_key is None or key > best_key:
+                best, best_key = (move, wdl), key
+        return best
+
+    def search(self, board: chess.Board) -> SearchInfo | None:
+        """The tablebase move as a search result, or None when not covered."""
+        start = time.perf_counter()
+        best = self.best_move(board)
+        if best is None:
+            return None
+        move, wdl = best
+        san = board.san(move)
+        return SearchInfo(
+            engine="tablebase",
+            move=san,
+            score=TB_WIN_SCORE * (wdl // 2),
+            pv=[san],
+            time=time.perf_counter() - start,
+        )
+
+    def close(self):
+        self.tablebase.close()
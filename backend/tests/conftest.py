@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Engine modules import each other as top-level modules, as when run from
+# backend/. Tests import them the same way, never as `backend.<module>`, so
+# that each module, and each class in it, is loaded only once.
+sys.path.insert(0, str(Path(__file__).parent.parent))
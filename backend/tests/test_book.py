@@ -0,0 +1,65 @@
+import chess
+
+from book import OpeningBook
+from classical import classical_move
+from mcts import MCTSAgent
+from training.build_book import build_book
+
+GAMES = """
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O Nf6 1-0
+
+[Result "1/2-1/2"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O d6 1/2-1/2
+
+[Result "0-1"]
+
+1. d4 d5 2. c4 e6 0-1
+"""
+
+
+def make_book(tmp_path, **kwargs):
+    pgn = tmp_path / "games.pgn"
+    pgn.write_text(GAMES)
+    path = tmp_path / "book.bin"
+    written = build_book(pgn, path, **kwargs)
+    return written, path
+
+
+def test_build_book_keeps_repeated_moves(tmp_path):
+    written, path = make_book(tmp_path, min_count=2)
+    # 1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O are shared by two games
+    assert written == 7
+    assert path.stat().st_size == written * 16
+
+
+def test_book_lookup(tmp_path):
+    _, path = make_book(tmp_path, min_count=1)
+    book = OpeningBook(path, weighted=False)
+    board = chess.Board()
+    # e4 won and drew, d4 lost
+    assert book.move(board) == chess.Move.from_uci("e2e4")
+    for san in ["e4", "e5", "Nf3", "Nc6", "Bc4", "Bc5"]:
+        board.push_san(san)
+    assert board.san(book.move(board)) == "O-O"
+    board.push_san("a3")
+    assert book.move(board) is None
+    assert book.hits == 2 and book.probes == 3
+    book.close()
+
+
+def test_engines_play_from_book(tmp_path):
+    _, path = make_book(tmp_path)
+    book = OpeningBook(path)
+    infos = []
+    assert classical_move(chess.Board(), book=book, info_callback=infos.append) == "e4"
+    assert infos[0].engine == "book"
+    agent = MCTSAgent(10, book=book)
+    assert agent.select_move(chess.Board()) == "e4"
+    assert agent.last_info.engine == "book"
+
+
+def test_open_missing_book(tmp_path):
+    assert OpeningBook.open(tmp_path / "missing.bin") is None
@@ -1,10 +1,30 @@
+import time
+
 import chess
 
-from backend.classical import (
+from classical import (
+    ClassicalEngine,
+    EXACT,
+    LOWER_BOUND,
+    IncrementalEvaluator,
+    PawnHashTable,
+    SearchState,
+    TranspositionTable,
+    alpha_beta_max,
+    attack_mobility,
     classical_move,
+    classical_search,
+    has_non_pawn_material,
+    is_losing_capture,
+    iterative_deepening,
+    material_score,
+    order_moves,
+    position_history,
+    quiescence,
     mobility,
     pawn_stats,
     shannon_score,
+    static_exchange_evaluation,
 )
 
 
@@ -21,6 +41,14 @@ def test_shannon_score_clear_board():
     assert score == 0
 
 
+def test_material_score_matches_shannon_material():
+    board = chess.Board("r3k3/8/8/8/8/8/1Q6/4K3 w - - 0 1")
+    assert material_score(board) == 9 - 5
+    assert material_score(chess.Board()) == 0
+    board.clear()
+    assert material_score(board) == 0
+
+
 def test_count_doubled_pawns_initial_position():
     board = chess.Board()
     doubled, _, _ = pawn_stats(board)
@@ -116,3 +144,408 @@ def test_mobility():
     board.push_san("e4")
     mob = mobility(board)
     assert mob == (30, 20)
+
+
+def test_transposition_table_store_and_probe():
+    tt = TranspositionTable(max_entries=16)
+    move = chess.Move.from_uci("e2e4")
+    tt.store(42, 3, 1.5, EXACT, move)
+    entry = tt.probe(42)
+    assert entry.depth == 3
+    assert entry.score == 1.5
+    assert entry.bound == EXACT
+    assert entry.best_move == move
+    assert tt.probe(43) is None
+    assert tt.hit_rate == 0.5
+
+
+def test_transposition_table_depth_preferred_replacement():
+    tt = TranspositionTable(max_entries=16, replacement="depth")
+    tt.store(1, 5, 1.0, EXACT, None)
+    tt.store(17, 2, 2.0, LOWER_BOUND, None)  # Same slot, shallower: rejected
+    assert tt.probe(1).score == 1.0
+    assert tt.probe(17) is None
+
+    tt = TranspositionTable(max_entries=16, replacement="always")
+    tt.store(1, 5, 1.0, EXACT, None)
+    tt.store(17, 2, 2.0, LOWER_BOUND, None)
+    assert tt.probe(1) is None
+    assert tt.probe(17).score == 2.0
+
+
+def test_transposition_table_replaces_older_generations():
+    tt = TranspositionTable(max_entries=16, replacement="depth")
+    tt.store(1, 5, 1.0, EXACT, None)
+    tt.new_search()
+    assert tt.probe(1).score == 1.0  # Old entries are still usable
+    tt.store(17, 2, 2.0, LOWER_BOUND, None)
+    assert tt.probe(1) is None
+    assert tt.probe(17).score == 2.0
+
+
+def test_transposition_table_is_bounded():
+    tt = TranspositionTable(max_entries=8)
+    for key in range(100):
+        tt.store(key, 1, 0, EXACT, None)
+    assert len(tt) == 8
+
+
+def test_alpha_beta_with_transposition_table_matches_plain_search():
+    board = chess.Board()
+    board.push_san("e4")
+    tt = TranspositionTable()
+    plain_score, _ = alpha_beta_max(board, 3, -float("inf"), float("inf"))
+    tt_score, _ = iterative_deepening(board, 3, SearchState(tt=tt))
+    assert tt_score == plain_score
+    assert tt.stores > 0
+
+
+def test_classical_move_reuses_transposition_table():
+    tt = TranspositionTable()
+    classical_move(chess.Board(), depth=2, tt=tt)
+    classical_move(chess.Board(), depth=2, tt=tt)
+    assert tt.hits > 0
+
+
+def test_iterative_deepening_records_principal_variation():
+    board = chess.Board()
+    state = SearchState(tt=TranspositionTable())
+    _, move = iterative_deepening(board, 3, state)
+    assert state.prev_pv[0] == move
+    assert len(state.prev_pv) == 3
+    assert board == chess.Board()
+
+
+def test_classical_move_with_movetime():
+    board = chess.Board()
+    board.push_san("e4")
+    fen = board.fen()
+    start = time.monotonic()
+    move = classical_move(board, movetime=0.5)
+    assert time.monotonic() - start < 2
+    assert board.fen() == fen
+    board.push_san(move)
+
+
+def test_order_moves_captures_before_quiet_moves():
+    board = chess.Board("4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1")
+    moves = order_moves(board, list(board.legal_moves))
+    assert moves[0] == chess.Move.from_uci("e4d5")
+
+
+def test_order_moves_killers_and_history():
+    board = chess.Board()
+    state = SearchState()
+    killer = chess.Move.from_uci("g1f3")
+    favoured = chess.Move.from_uci("b1c3")
+    state.record_cutoff(board, killer, depth=3, ply=0)
+    state.history[chess.WHITE][favoured.from_square * 64 + favoured.to_square] = 50
+    moves = order_moves(board, list(board.legal_moves), state, ply=0)
+    assert moves[0] == killer
+    assert moves[1] == favoured
+    assert state.cutoffs == 1
+
+
+def test_killers_and_history_reduce_nodes():
+    board = chess.Board()
+    plain = SearchState(tt=TranspositionTable(), use_killers=False, use_history=False)
+    ordered = SearchState(tt=TranspositionTable())
+    plain_score, _ = iterative_deepening(board, 3, plain)
+    ordered_score, _ = iterative_deepening(board, 3, ordered)
+    assert ordered_score == plain_score
+    assert ordered.nodes < plain.nodes
+
+
+def test_static_exchange_evaluation_defended_pawn():
+    board = chess.Board("4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1")
+    move = chess.Move.from_uci("d1d5")
+    assert static_exchange_evaluation(board, move) == -8
+    assert is_losing_capture(board, move)
+
+
+def test_static_exchange_evaluation_xray():
+    # Rook takes, rook recaptures, the rook behind recaptures again
+    board = chess.Board("3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1")
+    move = chess.Move.from_uci("d2d5")
+    assert static_exchange_evaluation(board, move) == 1
+    assert not is_losing_capture(board, move)
+
+
+def test_static_exchange_evaluation_en_passant():
+    board = chess.Board("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1")
+    assert static_exchange_evaluation(board, chess.Move.from_uci("e5d6")) == 1
+
+
+def test_order_moves_mvv_lva():
+    # Pawn takes queen first, queen takes defended pawn after the quiet moves
+    board = chess.Board("4k3/8/2p5/1p1q4/Q3P3/8/8/4K3 w - - 0 1")
+    moves = order_moves(board, list(board.legal_moves))
+    assert moves[0] == chess.Move.from_uci("e4d5")
+    assert moves.index(chess.Move.from_uci("a4b5")) > moves.index(
+        chess.Move.from_uci("e1f1")
+    )
+
+
+
+def test_order_moves_without_mvv_lva_keeps_captures_flat():
+    # Queen takes defended pawn is no longer ordered after the quiet moves
+    board = chess.Board("4k3/8/2p5/1p1q4/Q3P3/8/8/4K3 w - - 0 1")
+    moves = order_moves(board, list(board.legal_moves), SearchState(mvv_lva=False))
+    captures = {chess.Move.from_uci("e4d5"), chess.Move.from_uci("a4b5")}
+    assert set(moves[:2]) == captures
+
+def test_see_pruning_reduces_nodes():
+    board = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+    plain = SearchState(tt=TranspositionTable(), see_pruning=False)
+    pruned = SearchState(tt=TranspositionTable())
+    iterative_deepening(board, 3, plain)
+    iterative_deepening(board, 3, pruned)
+    assert pruned.see_pruned > 0
+    assert pruned.nodes < plain.nodes
+
+
+def test_quiescence_stands_pat_in_quiet_position():
+    board = chess.Board()
+    assert quiescence(board, -float("inf"), float("inf"), SearchState()) == shannon_score(board)
+
+
+def test_quiescence_sees_recapture():
+    # Qxd5 wins a pawn at the horizon but loses the queen to exd5
+    board = chess.Board("4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1")
+    horizon = SearchState(see_pruning=False, quiescence=False)
+    _, move = iterative_deepening(board, 1, horizon)
+    assert move == chess.Move.from_uci("d1d5")
+
+    quiet = SearchState(see_pruning=False)
+    _, move = iterative_deepening(board, 1, quiet)
+    assert move != chess.Move.from_uci("d1d5")
+    assert quiet.qnodes > 0
+
+
+def test_has_non_pawn_material():
+    assert has_non_pawn_material(chess.Board(), chess.WHITE)
+    pawn_ending = chess.Board("8/8/8/4k3/8/8/3PK3/8 w - - 0 1")
+    assert not has_non_pawn_material(pawn_ending, chess.WHITE)
+    assert not has_non_pawn_material(pawn_ending, chess.BLACK)
+
+
+def test_null_move_and_lmr_search():
+    board = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+    full = SearchState(tt=TranspositionTable())
+    selective = SearchState(tt=TranspositionTable(), null_move=True, lmr=True)
+    iterative_deepening(board, 4, full)
+    _, move = iterative_deepening(board, 4, selective)
+    assert move in board.legal_moves
+    assert selective.null_move_cutoffs > 0
+    assert selective.nodes < full.nodes
+
+
+def test_classical_move_with_null_move_and_lmr():
+    board = chess.Board()
+    move = classical_move(board, depth=3, null_move=True, lmr=True)
+    board.push_san(move)
+
+
+def test_classical_search_returns_principal_variation():
+    board = chess.Board()
+    result = classical_search(board, depth=3)
+    assert result.depth == 3
+    assert result.pv[0] == result.move
+    assert result.nodes > 0
+    assert result.tt_probes > 0
+    replay = chess.Board()
+    for san in result.pv:
+        replay.push_san(san)
+
+
+def test_pvs_and_aspiration_match_full_window_search():
+    board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    full = SearchState(tt=TranspositionTable(), pvs=False, aspiration=False)
+    pvs = SearchState(tt=TranspositionTable())
+    full_score, _ = iterative_deepening(board, 3, full)
+    pvs_score, _ = iterative_deepening(board, 3, pvs)
+    assert pvs_score == full_score
+
+
+def test_incremental_evaluator_matches_shannon_score():
+    board = chess.Board()
+    evaluator = IncrementalEvaluator(board)
+    # Captures, castling, en passant and a promotion with capture
+    for san in ["e4", "d5", "exd5", "Nf6", "Nf3", "c5", "dxc6", "e5", "Bc4", "Qd7",
+                "O-O", "a6", "cxb7", "Ra7", "bxc8=Q+"]:
+        move = board.parse_san(san)
+        evaluator.push(board, move)
+        board.push(move)
+        assert evaluator.evaluate(board) == shannon_score(board)
+
+
+def test_incremental_evaluator_pop_restores_counts():
+    board = chess.Board("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1")
+    evaluator = IncrementalEvaluator(board)
+    material = evaluator.material
+    move = chess.Move.from_uci("b7b8q")
+    evaluator.push(board, move)
+    board.push(move)
+    assert evaluator.material == material + 8
+    assert evaluator.piece_counts[chess.WHITE][chess.QUEEN] == 1
+    board.pop()
+    evaluator.pop()
+    assert evaluator.material == material
+    assert evaluator.piece_counts[chess.WHITE][chess.QUEEN] == 0
+    assert evaluator.piece_counts[chess.WHITE][chess.PAWN] == 1
+    assert evaluator.evaluate(board) == shannon_score(board)
+
+
+def test_incremental_evaluation_does_not_change_search():
+    board = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+    scanned = SearchState(tt=TranspositionTable(), incremental_eval=False)
+    incremental = SearchState(tt=TranspositionTable())
+    assert iterative_deepening(board, 3, scanned) == iterative_deepening(board, 3, incremental)
+    assert scanned.nodes == incremental.nodes
+
+
+def test_pawn_stats_with_pawn_hash_table():
+    table = PawnHashTable(max_entries=64)
+    board = chess.Board()
+    board.push_san("e4")
+    board.push_san("d5")
+    board.push_san("exd5")
+    assert pawn_stats(board, table) == pawn_stats(board)
+    assert pawn_stats(board, table) == ((2, 0), (0, 0), (0, 0))
+    assert table.hits == 1
+    # Only non-pawn moves: the structure is still cached
+    board.push_san("Nf6")
+    assert pawn_stats(board, table) == pawn_stats(board)
+    assert table.hits == 2
+
+
+def test_attack_mobility_initial_position():
+    board = chess.Board()
+    assert attack_mobility(board) == (20, 20)
+    board.push_san("e4")
+    assert attack_mobility(board) == (30, 20)
+
+
+def test_attack_mobility_counts_pawn_captures():
+    board = chess.Board("4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1")
+    # Kings: 5 squares each; pawns: one push and one capture each
+    assert attack_mobility(board) == (7, 7)
+
+
+def test_shannon_score_estimated_mobility():
+    assert shannon_score(chess.Board(), exact_mobility=False) == 0
+
+
+def test_position_history_counts_repeatable_positions():
+    board = chess.Board()
+    for san in ["Nf3", "Nf6", "Ng1", "Ng8", "Nf3", "Nf6", "Ng1", "Ng8"]:
+        board.push_san(san)
+    history = position_history(board)
+    start_key = chess.polyglot.zobrist_hash(chess.Board())
+    assert history[start_key] == 2
+    state = SearchState(game_history=history)
+    assert state.is_repetition(start_key)
+
+
+def test_alpha_beta_detects_stalemate_and_mate():
+    stalemate = chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")
+    assert alpha_beta_max(stalemate, 2, -float("inf"), float("inf"))[0] == 0
+
+    mate_in_one = chess.Board("7k/8/6K1/8/8/8/8/5Q2 w - - 0 1")
+    score, move = iterative_deepening(mate_in_one, 2, SearchState())
+    assert score == float("inf")
+    mate_in_one.push(move)
+    assert mate_in_one.is_checkmate()
+
+
+def test_alpha_beta_scores_draws_at_the_horizon():
+    # Qf7 stalemates: a draw, not the queen up that the evaluation sees
+    board = chess.Board("7k/8/6K1/8/8/8/8/5Q2 w - - 0 1")
+    board.push_san("Qf7")
+    for quiescence in (True, False):
+        state = SearchState(quiescence=quiescence)
+        assert alpha_beta_max(board, 0, -float("inf"), float("inf"), state)[0] == 0
+
+    board = chess.Board("4k3/8/8/8/8/8/8/3QK3 w - - 150 100")
+    assert alpha_beta_max(board, 0, -float("inf"), float("inf"))[0] == 0
+
+    # A third occurrence of the position
+    board = chess.Board("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")
+    board.push_san("Qd2")
+    state = SearchState(game_history={chess.polyglot.zobrist_hash(board): 2})
+    assert alpha_beta_max(board, 0, -float("inf"), float("inf"), state)[0] == 0
+
+
+def test_alpha_beta_scores_repetition_as_draw():
+    # White is a queen up, but Ng8 repeats the position for the third time
+    board = chess.Board("rnb1kbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    for san in ["Nf3", "Nf6", "Ng1", "Ng8", "Nf3", "Nf6", "Ng1"]:
+        board.push_san(san)
+    state = SearchState(
+        root_ply=len(board.move_stack), game_history=position_history(board)
+    )
+    board.push_san("Ng8")
+    assert alpha_beta_max(board, 2, -float("inf"), float("inf"), state)[0] == 0
+    state.game_history = {}
+    assert alpha_beta_max(board, 2, -float("inf"), float("inf"), state)[0] > 5
+
+
+def test_parallel_root_search_matches_single_process():
+    board = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+    single = classical_search(board, depth=2)
+    parallel = classical_search(board, depth=2, workers=2)
+    assert parallel.score == single.score
+    assert parallel.depth == 2
+    board.push_san(parallel.move)
+
+
+def test_classical_search_info_callback():
+    infos = []
+    result = classical_search(chess.Board(), depth=3, info_callback=infos.append)
+    # One call per completed iteration plus the final result
+    assert [info.depth for info in infos] == [1, 2, 3, 3]
+    assert infos[-1] == result
+    assert result.engine == "classical"
+    assert result.nps > 0
+    assert result.to_dict()["move"] == result.move
+
+
+def test_classical_move_info_callback_negamax():
+    infos = []
+    move = classical_move(chess.Board(), depth=1, alpha_beta=False, info_callback=infos.append)
+    assert infos[0].move == move
+    assert infos[0].engine == "negamax"
+
+
+def test_classical_engine_keeps_tables_between_moves():
+    engine = ClassicalEngine(tt_entries=1 << 12)
+    board = chess.Board()
+    board.push_san(engine.search(board, depth=3).move)
+    board.push_san("e5")
+    assert len(engine.tt) > 0
+    assert any(any(row) for row in engine.history)
+
+    result = engine.search(board, depth=3)
+    assert result.tt_hits > 0
+    assert len(engine.tt) <= 1 << 12
+
+
+def test_classical_engine_shifts_killers_to_new_root():
+    engine = ClassicalEngine()
+    board = chess.Board()
+    engine.new_state(board)
+    killer = chess.Move.from_uci("g1f3")
+    engine.killers[2][0] = killer
+    board.push_san("e4")
+    board.push_san("e5")
+    state = engine.new_state(board)
+    assert state.killers[0][0] == killer
+    assert len(state.killers) == len(SearchState().killers)
+
+
+def test_classical_engine_new_game_clears_tables():
+    engine = ClassicalEngine()
+    engine.search(chess.Board(), depth=2)
+    engine.new_game()
+    assert len(engine.tt) == 0
+    assert not any(any(row) for row in engine.history)
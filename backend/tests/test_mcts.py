@@ -1,9 +1,20 @@
 import chess
+import numpy as np
 
-from backend.mcts import (
+from mcts import (
+    AlphaBetaEvaluator,
+    BoundedPlayout,
+    CompactNode,
     MCTSAgent,
     Node,
+    RandomPlayout,
+    SHARED_TREE_NODES_PER_PLAYOUT,
+    SharedTree,
+    bounded_playout,
+    playout_move,
     uct,
+    uct_scores,
+    win_probability,
 )
 
 
@@ -210,3 +221,244 @@ def test_mcts_agent_select_child_single_child():
 
     selected = agent.select_child(root)
     assert selected == child
+
+
+def test_select_move_reports_search_info():
+    infos = []
+    agent = MCTSAgent(50, info_callback=infos.append)
+    board = chess.Board()
+    move = agent.select_move(board)
+    info = agent.last_info
+    assert infos == [info]
+    assert info.engine == "mcts"
+    assert info.move == move
+    assert info.pv[0] == move
+    assert info.playouts == 50
+    assert info.nodes == 51
+    assert info.depth >= 1
+    assert info.to_dict()["nps"] == info.nps
+
+
+def test_compact_node_has_no_board():
+    board = chess.Board()
+    root = CompactNode.root(board)
+    assert not hasattr(root, "__dict__")
+    assert root.move is None
+    assert root.turn == chess.WHITE
+    assert root.unvisited_moves is None  # Generated on first expansion
+    assert root.can_add_child(board)
+    assert len(root.unvisited_moves) == 20
+
+    child = root.add_random_child(board)
+    assert board.peek() == child.move
+    assert child.parent is root
+    assert child.turn == chess.BLACK
+    assert len(root.unvisited_moves) == 19
+    assert not child.is_terminal(board)
+
+    child.record_win(chess.BLACK)
+    assert child.wins[chess.BLACK] == 1.0
+    assert child.win_percent(chess.WHITE) == 0.0
+
+
+def test_search_restores_board():
+    agent = MCTSAgent(30)
+    board = chess.Board()
+    board.push_san("e4")
+    root = CompactNode.root(board)
+    agent.search(root, board, 30)
+    assert root.visits == 30
+    assert board.move_stack == [chess.Move.from_uci("e2e4")]
+    assert all(child.move in board.legal_moves for child in root.children)
+
+
+def test_node_generates_moves_lazily():
+    board = chess.Board()
+    node = Node(board, None)
+    assert node._unvisited_moves is None
+    assert sorted(map(str, node.unvisited_moves)) == sorted(map(str, board.legal_moves))
+    child = node.add_random_child()
+    assert child._unvisited_moves is None
+    assert child.move not in node.unvisited_moves
+
+
+def test_tree_is_reused_after_move_and_reply():
+    agent = MCTSAgent(100, reuse_tree=True)
+    board = chess.Board()
+    board.push_san(agent.select_move(board))
+    old_root, _, _ = agent.tree
+    played = next(c for c in old_root.children if c.move == board.peek())
+    reply = max(played.children, key=lambda child: child.visits)
+    board.push(reply.move)
+
+    root = agent.tree_root(board)
+    assert root is reply
+    assert root.parent is None
+    assert root.visits > 0
+    # Visits already in the subtree count towards num_rounds
+    agent.select_move(board)
+    assert root.visits == max(100, reply.visits)
+
+
+def test_tree_is_replaced_when_game_differs():
+    agent = MCTSAgent(20, reuse_tree=True)
+    board = chess.Board()
+    agent.select_move(board)
+    other = chess.Board("8/8/8/4k3/8/8/8/R3K3 w - - 0 1")
+    root = agent.tree_root(other)
+    assert root.visits == 0
+    assert agent.tree[0] is root
+
+
+def test_tree_is_not_kept_by_default():
+    agent = MCTSAgent(20)
+    agent.select_move(chess.Board())
+    assert agent.tree is None
+
+
+def test_root_parallel_merges_worker_statistics():
+    infos = []
+    agent = MCTSAgent(20, workers=2, info_callback=infos.append)
+    board = chess.Board()
+    move = agent.select_move(board)
+    board.push_san(move)
+    info = infos[-1]
+    assert info.move == move
+    assert info.playouts == 40
+    assert info.nodes == 42
+
+
+def test_compact_node_child_arrays_match_children():
+    agent = MCTSAgent(60)
+    board = chess.Board()
+    root = CompactNode.root(board)
+    agent.search(root, board, 60)
+    visits, wins = root.child_arrays()
+    assert list(visits) == [child.visits for child in root.children]
+    assert list(wins) == [child.wins[root.turn] for child in root.children]
+    assert root.children_visits == sum(child.visits for child in root.children)
+
+    # The arrays follow later playouts
+    agent.search(root, board, 40)
+    assert list(root.child_visits) == [child.visits for child in root.children]
+    assert list(root.child_wins) == [child.wins[root.turn] for child in root.children]
+
+    expected = max(
+        root.children,
+        key=lambda child: uct(child.wins[root.turn], root.children_visits, child.visits),
+    )
+    assert agent.select_child(root) is expected
+
+
+def test_uct_scores_matches_uct():
+    wins = np.array([0.0, 3.0, 1.0])
+    visits = np.array([0.0, 5.0, 2.0])
+    assert list(uct_scores(wins, 7, visits)) == [uct(w, 7, v) for w, v in zip(wins, visits)]
+    assert list(uct_scores(wins, 0, visits)) == [uct(w, 0, v) for w, v in zip(wins, visits)]
+
+
+def test_playout_move_prefers_captures():
+    # Of the many rook moves, one takes the queen
+    board = chess.Board("4k3/8/8/8/q7/8/8/R3K3 w - - 0 1")
+    moves = [playout_move(board) for _ in range(200)]
+    assert all(board.is_legal(move) for move in moves)
+    capture = chess.Move.from_uci("a1a4")
+    assert moves.count(capture) > 200 / board.legal_moves.count()
+
+
+def test_playout_move_without_legal_moves():
+    board = chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")  # Stalemate
+    assert playout_move(board) is None
+
+
+def test_bounded_playout_results():
+    board = chess.Board()
+    for _ in range(5):
+        assert bounded_playout(board, 10) in [chess.WHITE, chess.BLACK]
+    assert board == chess.Board()
+
+    # Checkmate and stalemate end the playout before any cut-off
+    mate = chess.Board("7k/6Q1/6K1/8/8/8/8/8 b - - 0 1")
+    assert bounded_playout(mate, 10) == chess.WHITE
+    stalemate = chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")
+    assert bounded_playout(stalemate, 10) is None
+
+
+def test_bounded_playout_scores_cut_off():
+    # A queen up, White wins about 97% of the playouts cut off at once
+    board = chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")
+    winners = [bounded_playout(board, 0) for _ in range(50)]
+    assert winners.count(chess.WHITE) > 40
+    winners = [bounded_playout(board, 0, lambda board: -20) for _ in range(50)]
+    assert winners.count(chess.BLACK) > 40
+
+
+def test_win_probability():
+    assert win_probability(0) == 0.5
+    assert win_probability(1) == 1 - win_probability(-1)
+    assert 0.55 < win_probability(1) < 0.65
+    assert win_probability(float("inf")) == 1
+    assert win_probability(-1e6) == 0
+
+
+def test_alpha_beta_evaluator():
+    evaluator = AlphaBetaEvaluator(depth=1)
+    # Black to move can only lose more: White is a queen up
+    board = chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")
+    winners = [evaluator(board) for _ in range(50)]
+    assert winners.count(chess.WHITE) > 40
+    assert board == chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")
+
+    # White to move wins the hanging queen
+    board = chess.Board("4k3/8/8/8/3q4/8/8/3RK3 w - - 0 1")
+    winners = [evaluator(board) for _ in range(50)]
+    assert winners.count(chess.WHITE) > 40
+
+    assert evaluator(chess.Board("7k/6Q1/6K1/8/8/8/8/8 b - - 0 1")) == chess.WHITE
+    assert evaluator(chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")) is None
+
+
+def test_mcts_agent_leaf_evaluators():
+    board = chess.Board()
+    for evaluator in (RandomPlayout(), BoundedPlayout(8), AlphaBetaEvaluator()):
+        agent = MCTSAgent(30, evaluator=evaluator)
+        assert agent.rollout(board) in [chess.WHITE, chess.BLACK, None]
+        move = agent.select_move(board)
+        assert board.parse_san(move) in board.legal_moves
+        assert agent.last_info.playouts == 30
+
+
+def test_root_parallel_mcts_uses_evaluator():
+    agent = MCTSAgent(20, workers=2, evaluator=BoundedPlayout(4))
+    board = chess.Board()
+    assert board.parse_san(agent.select_move(board)) in board.legal_moves
+    assert agent.last_info.playouts == 40
+
+
+def test_shared_tree_statistics_add_up():
+    board = chess.Board()
+    tree = SharedTree(1 + 60 * SHARED_TREE_NODES_PER_PLAYOUT)
+    try:
+        tree.search(board, 60, 2, BoundedPlayout(4))
+        # Every virtual loss was turned back into a single visit
+        assert tree.visits[0] == 60
+        for node in range(tree.size):
+            first, count = tree.first_child[node], tree.child_count[node]
+            if first < 0 or count == 0:
+                continue
+            # An expanded node was played out once itself before its children
+            expected = tree.visits[node] - (node != 0)
+            assert tree.visits[first : first + count].sum() == expected
+            assert tree.wins[node].sum() <= tree.visits[node]
+    finally:
+        tree.close()
+        tree.unlink()
+
+
+def test_tree_parallel_mcts_shares_one_tree():
+    agent = MCTSAgent(40, tree_workers=2, evaluator=BoundedPlayout(4))
+    board = chess.Board()
+    move = agent.select_move(board)
+    assert board.parse_san(move) in board.legal_moves
+    assert agent.last_info.move == move
+    assert agent.last_info.playouts == 40
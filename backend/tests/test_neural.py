@@ -1,6 +1,6 @@
 import chess
 
-from backend.neural import neural_move
+from neural import neural_move
 
 def test_neural_move_initial_position():
     board = chess.Board()
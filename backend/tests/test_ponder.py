@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+
+import chess
+
+from classical import ClassicalEngine, classical_search
+from mcts import MCTSAgent
+import ponder
+from ponder import Ponderer, ponder_classical, ponder_mcts, predicted_reply
+
+
+def test_stop_returns_first_iteration():
+    stop = threading.Event()
+    stop.set()
+    result = classical_search(chess.Board(), depth=5, stop=stop)
+    assert result.depth == 1
+    assert result.move is not None
+
+
+def test_predicted_reply():
+    board = chess.Board()
+    result = classical_search(board, depth=2)
+    reply = predicted_reply(board, result)
+    after = board.copy()
+    after.push_san(result.move)
+    assert reply in after.legal_moves
+
+
+def test_ponder_classical_fills_engine_tables():
+    engine = ClassicalEngine()
+    ponderer = Ponderer()
+    board = chess.Board()
+    board.push_san("e4")
+    ponderer.start("classical", board, ponder_classical(engine))
+    assert ponderer.is_pondering(board, "classical")
+    assert not ponderer.is_pondering(board, "mcts")
+    time.sleep(0.2)
+    result = ponderer.finish(0.1)
+    assert result.depth >= 1
+    assert chess.Board(board.fen()).parse_san(result.move)
+    assert len(engine.tt) > 0
+    assert ponderer.board is None
+
+
+def test_ponder_mcts_tree_is_reused():
+    agent = MCTSAgent(50)
+    ponderer = Ponderer()
+    board = chess.Board()
+    ponderer.start("mcts", board, ponder_mcts(agent))
+    time.sleep(0.1)
+    root = ponderer.finish()
+    pondered = root.visits
+    assert pondered > 0
+    agent.select_move(board, root)
+    assert root.visits == max(pondered, 50)
+
+
+def test_cancel_discards_result():
+    ponderer = Ponderer()
+    ponderer.start("classical", chess.Board(), ponder_classical(ClassicalEngine()))
+    ponderer.cancel()
+    assert not ponderer.is_pondering(chess.Board())
+    assert ponderer.finish() is None
+
+
+def test_ponder_mcts_grows_kept_tree():
+    # Seeded so that the move played has a reply in the tree to ponder on
+    random.seed(1)
+    agent = MCTSAgent(100, reuse_tree=True)
+    board = chess.Board()
+    board.push_san(agent.select_move(board))
+    reply = predicted_reply(chess.Board(), agent.last_info)
+    ponder_board = board.copy()
+    ponder_board.push(reply)
+    ponderer = Ponderer()
+    ponderer.start("mcts", ponder_board, ponder_mcts(agent))
+    time.sleep(0.1)
+    pondered = ponderer.finish()
+    # On a ponder miss the other replies are still in the tree
+    assert agent.tree[0].move == board.peek()
+    assert pondered.parent is agent.tree[0]
+    assert agent.tree_root(ponder_board) is pondered
+
+
+def test_failed_ponder_search_returns_none():
+    def search(board, stop):
+        raise RuntimeError("search failed")
+
+    ponderer = Ponderer()
+    ponderer.start("classical", chess.Board(), search)
+    assert ponderer.finish(1.0) is None
+
+
+def test_ponder_classical_stops_on_its_own(monkeypatch):
+    monkeypatch.setattr(ponder, "MAX_PONDER_TIME", 0.2)
+    ponderer = Ponderer()
+    ponderer.start("classical", chess.Board(), ponder_classical(ClassicalEngine()))
+    start = time.monotonic()
+    # Waits for the search to end by itself, without setting stop
+    result = ponderer.finish(30.0)
+    assert time.monotonic() - start < 10
+    assert result.move is not None
+
+
+def test_ponder_mcts_stops_on_its_own(monkeypatch):
+    monkeypatch.setattr(ponder, "MAX_PONDER_TIME", 0.2)
+    agent = MCTSAgent(num_rounds=10)
+    ponderer = Ponderer()
+    ponderer.start("mcts", chess.Board(), ponder_mcts(agent))
+    start = time.monotonic()
+    # Waits for the search to end by itself, without setting stop
+    root = ponderer.finish(30.0)
+    assert time.monotonic() - start < 10
+    assert 0 < root.visits < ponder.MAX_PONDER_PLAYOUTS
@@ -1,6 +1,9 @@
 import chess
+import pytest
 
-from backend.reinforcement import (
+from mcts import MCTSAgent
+from reinforcement import (
+    NeuralEvaluator,
     ReinforcementAgent,
     ReinforcementNode,
     puct
@@ -41,6 +44,15 @@ def test_mcts_agent_rollout_terminates():
     assert winner is not None
 
 
+def test_neural_evaluator_in_mcts_agent():
+    evaluator = NeuralEvaluator()
+    agent = MCTSAgent(10, evaluator=evaluator)
+    board = chess.Board()
+    move = agent.select_move(board)
+    assert board.parse_san(move) in board.legal_moves
+    assert evaluator.evals > 0
+
+
 def test_mcts_agent_select_move():
     agent = ReinforcementAgent(10)  # Use fewer rounds for faster testing
     board = chess.Board()
@@ -95,3 +107,16 @@ def test_mcts_agent_select_child_single_child():
 
     selected = agent.select_child(root)
     assert selected == child
+
+
+def test_child_arrays_follow_search():
+    agent = ReinforcementAgent(60)
+    board = chess.Board()
+    root = ReinforcementNode.root(board)
+    agent.search(root, board, 60)
+    assert root.visits == 60
+    assert root.children_visits == sum(child.visits for child in root.children)
+    assert list(root.child_visits) == [child.visits for child in root.children]
+    assert list(root.child_values) == pytest.approx([child.wins for child in root.children])
+    assert len(root.priors) == len(root.children)
+    assert 0 < root.priors.sum() <= 1 + 1e-6
@@ -0,0 +1,14 @@
+import math
+
+from search_info import SearchInfo
+
+
+def test_nps():
+    assert SearchInfo("classical", nodes=1000, time=0.5).nps == 2000
+    assert SearchInfo("classical", nodes=1000).nps == 0.0
+
+
+def test_to_dict_mate_scores():
+    assert SearchInfo("classical", score=math.inf).to_dict()["score"] == "mate"
+    assert SearchInfo("classical", score=-math.inf).to_dict()["score"] == "-mate"
+    assert SearchInfo("classical", score=1.5).to_dict()["score"] == 1.5
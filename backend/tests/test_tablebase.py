@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import chess
+
+from classical import SearchState, TranspositionTable, alpha_beta_max, classical_move
+from mcts import MCTSAgent, exact_winner
+from tablebase import TB_WIN_SCORE, Tablebase
+
+# The KQvK and KRvK tables, a few KB, from the python-chess test data
+SYZYGY_PATH = Path(__file__).parent / "data" / "syzygy"
+
+KRK = "8/8/8/4k3/8/8/8/R3K3 w - - 0 1"
+
+
+def test_open_without_tables(tmp_path):
+    assert Tablebase.open(tmp_path / "missing") is None
+    assert Tablebase.open(tmp_path) is None
+
+
+def test_probe_results():
+    tablebase = Tablebase(SYZYGY_PATH)
+    assert tablebase.wdl(chess.Board(KRK)) == 2
+    assert tablebase.wdl(chess.Board("8/8/8/4k3/8/8/8/4K2R b K - 0 1")) is None
+    assert tablebase.score(chess.Board(KRK), ply=3) == TB_WIN_SCORE - 3
+    # Bare kings are a draw without any table
+    assert tablebase.wdl(chess.Board("8/8/8/4k3/8/8/8/4K3 w - - 0 1")) == 0
+    # More pieces than the tables hold
+    assert tablebase.wdl(chess.Board("8/8/8/4k3/8/8/8/Q2RK3 w - - 0 1")) is None
+
+
+def test_winner():
+    tablebase = Tablebase(SYZYGY_PATH)
+    assert tablebase.winner(chess.Board(KRK)) == (True, chess.WHITE)
+    assert tablebase.winner(chess.Board("8/8/8/4k3/8/8/8/R3K3 b - - 0 1")) == (
+        True,
+        chess.WHITE,
+    )
+    assert tablebase.winner(chess.Board("8/8/8/4k3/8/8/8/4K3 w - - 0 1")) == (True, None)
+    assert tablebase.winner(chess.Board("8/8/8/4k3/8/8/8/Q2RK3 w - - 0 1")) == (False, None)
+
+
+def test_exact_winner():
+    tablebase = Tablebase(SYZYGY_PATH)
+    mated = chess.Board("R3k3/8/4K3/8/8/8/8/8 b - - 0 1")
+    assert exact_winner(mated, tablebase) == (True, chess.WHITE)
+    assert exact_winner(chess.Board(KRK), tablebase) == (True, chess.WHITE)
+    assert exact_winner(chess.Board(KRK)) == (False, None)
+    assert exact_winner(chess.Board(), tablebase) == (False, None)
+
+
+def test_open_with_tables():
+    tablebase = Tablebase.open(SYZYGY_PATH)
+    assert tablebase.max_pieces == 3
+    tablebase.close()
+
+
+def test_best_move_mates():
+    tablebase = Tablebase(SYZYGY_PATH)
+    # Mate in one beats every other winning move
+    board = chess.Board("7k/8/6K1/8/8/8/8/5Q2 w - - 0 1")
+    move, wdl = tablebase.best_move(board)
+    assert wdl == 2
+    board.push(move)
+    assert board.is_checkmate()
+
+    # Both sides playing by WDL then DTZ: the win is converted quickly
+    board = chess.Board("8/8/8/4k3/8/8/8/3QK3 w - - 0 1")
+    for _ in range(40):
+        if board.is_game_over():
+            break
+        move, wdl = tablebase.best_move(board)
+        assert wdl == (2 if board.turn == chess.WHITE else -2)
+        board.push(move)
+    assert board.is_checkmate()
+
+    # A lost side keeps the game going as long as it can
+    board = chess.Board("8/8/8/4k3/8/8/8/R3K3 b - - 0 1")
+    assert tablebase.best_move(board)[1] == -2
+    info = tablebase.search(chess.Board(KRK))
+    assert info.engine == "tablebase"
+    assert info.score == TB_WIN_SCORE
+
+
+def test_root_move_keeps_the_win():
+    tablebase = Tablebase(SYZYGY_PATH)
+    board = chess.Board(KRK)
+    move = classical_move(board, depth=3, tablebase=tablebase)
+    board.push_san(move)
+    assert tablebase.wdl(board) == -2
+
+
+def test_search_and_rollouts_use_tablebase():
+    tablebase = Tablebase(SYZYGY_PATH)
+    board = chess.Board(KRK)
+    state = SearchState(tt=TranspositionTable(), tablebase=tablebase)
+    state.root_ply = len(board.move_stack)
+    score, _ = alpha_beta_max(board, 2, -float("inf"), float("inf"), state)
+    assert score >= TB_WIN_SCORE - 2
+    assert MCTSAgent(tablebase=tablebase).rollout(board) == chess.WHITE
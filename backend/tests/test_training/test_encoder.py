@@ -1,6 +1,6 @@
 import chess
 import numpy as np
-from backend.training.encoder import encode_board
+from training.encoder import encode_board
 
 # Initial chess board setup as bit mask using encoder ordering
 # 18 planes: 0-5 for white pieces (Pawn, Knight, Bishop, Rook, Queen, King)
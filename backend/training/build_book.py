@@ -0,0 +1,111 @@
+"""Compile training/lichess_filtered.pgn into a Polyglot opening book.
+
+Run from the backend directory:
+
+    python training/build_book.py [--max-ply 20] [--min-count 2]
+"""
+
+import argparse
+import struct
+from collections import defaultdict
+from pathlib import Path
+import sys
+
+# Add parent directory to path to allow imports when running as script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+PGN_PATH = Path("training/lichess_filtered.pgn")
+BOOK_PATH = Path("training/opening_book.bin")
+
+# Only positions this early in the game go into the book
+MAX_BOOK_PLY = 20
+# Moves played fewer times than this in a position are left out
+MIN_MOVE_COUNT = 2
+
+# Polyglot entries are 16 big-endian bytes: key, move, weight and learn
+ENTRY = struct.Struct(">QHHI")
+MAX_WEIGHT = 0xFFFF
+
+# Points for the side that played the move
+RESULT_POINTS = {
+    "1-0": {chess.WHITE: 2, chess.BLACK: 0},
+    "0-1": {chess.WHITE: 0, chess.BLACK: 2},
+    "1/2-1/2": {chess.WHITE: 1, chess.BLACK: 1},
+}
+
+
+def polyglot_move(board: chess.Board, move: chess.Move) -> int:
+    """Encode a move the Polyglot way, where castling is king takes rook."""
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if chess.square_file(move.to_square) == 6 else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | move.from_square << 6 | promotion << 12
+
+
+def count_book_moves(
+    pgn_path: Path, max_ply: int = MAX_BOOK_PLY
+) -> dict[tuple[int, int], list[int]]:
+    """Times played and result points of each (Zobrist key, move) in the PGN."""
+    counts = defaultdict(lambda: [0, 0])
+    with open(pgn_path, "r", encoding="utf-8") as pgn:
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+
+            points = RESULT_POINTS.get(game.headers.get("Result"))
+            board = game.board()
+            for ply, move in enumerate(game.mainline_moves()):
+                if ply >= max_ply:
+                    break
+                key = chess.polyglot.zobrist_hash(board)
+                count = counts[key, polyglot_move(board, move)]
+                count[0] += 1
+                if points is not None:
+                    count[1] += points[board.turn]
+                board.push(move)
+    return counts
+
+
+def build_book(
+    pgn_path: Path = PGN_PATH,
+    book_path: Path = BOOK_PATH,
+    max_ply: int = MAX_BOOK_PLY,
+    min_count: int = MIN_MOVE_COUNT,
+) -> int:
+    """Write the book sorted by key, as Polyglot readers binary search it.
+
+    A move's weight is its result points (2 per win, 1 per draw) plus one per
+    game, so moves that lost every time can still be played. Returns the number
+    of entries written.
+    """
+    counts = count_book_moves(pgn_path, max_ply)
+    entries = sorted(
+        (key, move, count[0] + count[1])
+        for (key, move), count in counts.items()
+        if count[0] >= min_count
+    )
+    scale = max((weight for _, _, weight in entries), default=0) / MAX_WEIGHT
+    with open(book_path, "wb") as book:
+        for key, move, weight in entries:
+            if scale > 1:
+                weight = max(1, int(weight / scale))
+            book.write(ENTRY.pack(key, move, weight, 0))
+    return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pgn", type=Path, default=PGN_PATH)
+    parser.add_argument("--out", type=Path, default=BOOK_PATH)
+    parser.add_argument("--max-ply", type=int, default=MAX_BOOK_PLY)
+    parser.add_argument("--min-count", type=int, default=MIN_MOVE_COUNT)
+    args = parser.parse_args()
+    written = build_book(args.pgn, args.out, args.max_ply, args.min_count)
+    print(f"Wrote {written} book entries to {args.out}")